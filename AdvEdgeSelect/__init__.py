@@ -3,31 +3,15 @@ bl_info = {
     "category": "Object",
     'blender': (2, 80, 0),
 }
-print("B")
 import bpy
 import bmesh
 
-def ordered_edge_list(center:bmesh.types.BMVert, start:bmesh.types.BMEdge):
-    out = [start]
-    cur = start
-    faces = list(center.link_faces)
-    while len(faces):
-        for f in faces:
-            if cur in f.edges:
-                other_edge = None
-                for e in f.edges:
-                    if e == cur:
-                        continue
-                    if center in e.verts:
-                        other_edge = e
-                        break
-                if other_edge is None:
-                    return faces
-                cur = other_edge
-                out.append(cur)
-                faces.remove(f)
-                break
-    return out
+import Instrumentation
+import Loader
+
+np = Loader.lazy("numpy")
+Topology = Loader.lazy("Topology")
+edge_walks = Loader.lazy("MeshKernel.edges")
 
 
 class AdvancedEdgeSelect(bpy.types.Operator):
@@ -67,51 +51,25 @@ class AdvancedEdgeSelect(bpy.types.Operator):
     def poll(cls, context: bpy.types.Context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         obj = context.active_object
 
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
-
-        to_explore = []
-
-        def select_edge(edge: bmesh.types.BMEdge):
-            if len(edge.link_faces) == 1:
-                return
-            edge.select = True
-            for v in edge.verts:
-                n = len(v.link_edges)
-                other_edges = set(v.link_edges) - {edge}
-                if n == 2:
-                    to_explore.append(v.link_edges[0] if v.link_edges[0] != edge else v.link_edges[1])
-                if n == 3 and self.action3 == "1":
-                    to_explore.extend(other_edges)
-                if n == 4 and self.action4 == "1":
-                    e = ordered_edge_list(v, edge)
-                    to_explore.append(e[2])
-                if n == 5 and self.action5 == "1":
-                    to_explore.extend(other_edges)
-
-                if n >= 6 and n % 2 == 0:
-                    if self.actionEven == "1":
-                        to_explore.append(ordered_edge_list(v, edge)[n/2])
-                    if self.actionEven == "2":
-                        to_explore.append(ordered_edge_list(v, edge)[2::2])
-
-                if n >= 7 and n % 2 == 1 and self.actionOdd == "1":
-                    to_explore.extend(other_edges)
-
-
-        for e in bm.edges:
-            if e.select:
-                select_edge(e)
-
-        while to_explore:
-            print(len(to_explore))
-            f = to_explore.pop(0)
-            if f.select:
-                continue
-            select_edge(f)
+        Topology.lookup(bm)
+
+        table = edge_walks.next_edge_table(topo, self.action3, self.action4, self.action5, self.actionEven, self.actionOdd)
+        # Boundary edges are never selected or continued through.
+        blocked = topo.edge_faces.degree() == 1
+        initial = Topology.read_selection(me.edges)
+        selected = initial.copy()
+        rounds = edge_walks.propagate_edges(table, selected, blocked)
+
+        for e in np.flatnonzero(selected & ~initial):
+            bm.edges[e].select = True
+        self.report({'INFO'}, "Selected %d edges in %d rounds" % (np.count_nonzero(selected & ~initial), rounds))
 
         bmesh.update_edit_mesh(me)
         me.update()
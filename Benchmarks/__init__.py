@@ -0,0 +1,254 @@
+"""
+Micro-benchmarks for the topology primitives the operators are built on.
+
+Meshes come from procedural generators and are built as MeshKernel meshes,
+so everything runs under plain CPython. Run with `python -m Benchmarks` from
+the add-on directory; results are printed as JSON.
+"""
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+import MeshKernel
+from MeshKernel import edges, quads, stars
+
+# Generators.
+
+
+def grid_quads(rows, cols):
+    """Vert index (cols + 1) * i + j grid, as (coords, quads) arrays."""
+    i, j = np.meshgrid(np.arange(rows + 1), np.arange(cols + 1), indexing='ij')
+    co = np.stack([j.ravel(), i.ravel(), np.zeros(i.size)], axis=1).astype(np.float64)
+    a = (i[:-1, :-1] * (cols + 1) + j[:-1, :-1]).ravel()
+    faces = np.stack([a, a + 1, a + cols + 2, a + cols + 1], axis=1)
+    return co, faces
+
+
+def from_faces(co, faces):
+    """Build a kernel Mesh from a face array, or a list of face arrays of different sizes."""
+    if not isinstance(faces, list):
+        faces = [faces]
+    faces = [f for f in faces if len(f)]
+    loop_total = np.concatenate([np.full(len(f), f.shape[1], dtype=np.int64) for f in faces])
+    loop_verts = np.concatenate([f.ravel() for f in faces]).astype(np.int64)
+    loop_start = np.cumsum(loop_total) - loop_total
+    edge_verts, loop_edges = MeshKernel.edges_from_loops(len(co), loop_start, loop_total, loop_verts)
+    return MeshKernel.from_arrays(len(co), edge_verts, loop_start, loop_total, loop_verts, loop_edges, co)
+
+
+def tri_grid(faces):
+    """Square grid of about `faces` triangles, all interior verts of valence 6."""
+    n = max(int(np.sqrt(faces / 2)), 1)
+    co, q = grid_quads(n, n)
+    return from_faces(co, np.concatenate([q[:, [0, 1, 2]], q[:, [0, 2, 3]]]))
+
+
+def star_lattice(faces):
+    """Geodesic icosphere with at least `faces` triangles.
+
+    The twelve icosahedron corners are valence 5, everything else valence 6.
+    """
+    t = (1 + 5 ** 0.5) / 2
+    co = np.array([[-1, t, 0], [1, t, 0], [-1, -t, 0], [1, -t, 0], [0, -1, t], [0, 1, t],
+                   [0, -1, -t], [0, 1, -t], [t, 0, -1], [t, 0, 1], [-t, 0, -1], [-t, 0, 1]], dtype=np.float64)
+    tris = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11], [1, 5, 9], [5, 11, 4],
+                     [11, 10, 2], [10, 7, 6], [7, 1, 8], [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8],
+                     [3, 8, 9], [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]], dtype=np.int64)
+    while len(tris) < faces:
+        # Split every triangle into four at its edge midpoints.
+        n = len(co)
+        pairs = np.stack([tris, np.roll(tris, -1, axis=1)], axis=2).reshape(-1, 2)
+        keys, edge = np.unique(np.sort(pairs, axis=1) @ [n, 1], return_inverse=True)
+        mid = (co[keys // n] + co[keys % n]) / 2
+        co = np.concatenate([co, mid / np.linalg.norm(mid, axis=1, keepdims=True) * np.linalg.norm(co[0])])
+        m = n + edge.reshape(-1, 3)
+        a, b, c = tris.T
+        tris = np.concatenate([np.stack([a, m[:, 0], m[:, 2]], axis=1), np.stack([m[:, 0], b, m[:, 1]], axis=1),
+                               np.stack([m[:, 2], m[:, 1], c], axis=1), m])
+    return from_faces(co, tris)
+
+
+def tri_strips(faces, length=64):
+    """Separate strips of 2 * `length` triangles each, about `faces` triangles in total."""
+    count = max(faces // (2 * length), 1)
+    co, q = grid_quads(1, length)
+    verts = len(co)
+    offset = np.arange(count)[:, None, None] * verts
+    all_co = np.concatenate([co + [0, 2 * k, 0] for k in range(count)])
+    q = (q[None] + offset).reshape(-1, 4)
+    return from_faces(all_co, np.concatenate([q[:, [0, 1, 2]], q[:, [0, 2, 3]]]))
+
+
+def broken_quads(faces, broken=0.1, seed=0):
+    """Quad grid of about `faces` faces with a random `broken` fraction of quads split into triangles."""
+    n = max(int(np.sqrt(faces)), 1)
+    co, q = grid_quads(n, n)
+    split = np.random.RandomState(seed).random_sample(len(q)) < broken
+    return from_faces(co, [q[~split], q[split][:, [0, 1, 2]], q[split][:, [0, 2, 3]]])
+
+
+GENERATORS = {
+    'tri_grid': tri_grid,
+    'star_lattice': star_lattice,
+    'tri_strips': tri_strips,
+    'broken_quads': broken_quads,
+}
+
+# Benchmarks. Each takes a mesh and a sample size and returns (calls, seconds).
+
+
+def _sample(seq, count, seed=0):
+    index = np.random.RandomState(seed).choice(len(seq), min(count, len(seq)), replace=False)
+    return [seq[int(i)] for i in index]
+
+
+def bench_neighbor_verts(mesh, sample):
+    # The element helpers are gone; the operators read the CSR rows instead.
+    vert_verts = mesh.topology().vert_verts
+    verts = _sample(np.arange(len(vert_verts)), sample)
+    start = time.perf_counter()
+    for v in verts:
+        vert_verts[v]
+    return len(verts), time.perf_counter() - start
+
+
+def bench_neighbor_faces(mesh, sample):
+    face_faces = mesh.topology().face_faces
+    faces = _sample(np.arange(len(face_faces)), sample)
+    start = time.perf_counter()
+    for f in faces:
+        face_faces[f]
+    return len(faces), time.perf_counter() - start
+
+
+def bench_get_neighbors(mesh, sample):
+    faces = _sample(mesh.faces, sample)
+    start = time.perf_counter()
+    for f in faces:
+        quads.get_neighbors(f)
+    return len(faces), time.perf_counter() - start
+
+
+def bench_ordered_edge_list(mesh, sample):
+    verts = [v for v in _sample(mesh.verts, sample) if v.link_edges]
+    starts = [v.link_edges[0] for v in verts]
+    start = time.perf_counter()
+    for v, e in zip(verts, starts):
+        edges.ordered_edge_list(v, e)
+    return len(verts), time.perf_counter() - start
+
+
+def bench_neighbor_star_points(mesh, sample):
+    topo = mesh.topology()
+    topo.vert_verts
+    verts = _sample(np.arange(topo.num_verts), sample)
+    start = time.perf_counter()
+    for v in verts:
+        stars.neighbor_star_points(topo, v)
+    return len(verts), time.perf_counter() - start
+
+
+def bench_neighbor_star_points_batch(mesh, sample):
+    topo = mesh.topology()
+    topo.vert_verts
+    verts = np.asarray(_sample(np.arange(topo.num_verts), sample))
+    start = time.perf_counter()
+    stars.neighbor_star_points_batch(topo, verts)
+    return len(verts), time.perf_counter() - start
+
+
+def bench_edge_walker_step(mesh, sample):
+    # The walker is built once per mesh, only stepping is timed.
+    cache = mesh.topology().cache
+    if 'strip_walker' not in cache:
+        cache['strip_walker'] = quads.strip_walker(mesh.faces)
+    ew = cache['strip_walker']
+    ends = [e for e in range(len(ew.edges)) if len(ew.neighbors(e)) < 2]
+    calls = 0
+    start = time.perf_counter()
+    for e in ends:
+        ew.prev, ew.cur = -1, e
+        while ew.cur != -1 and calls < sample:
+            ew.step()
+            calls += 1
+    return calls, time.perf_counter() - start
+
+
+BENCHMARKS = {
+    'neighbor_verts': (bench_neighbor_verts, ['tri_grid', 'star_lattice', 'broken_quads']),
+    'neighbor_faces': (bench_neighbor_faces, ['tri_grid', 'star_lattice', 'broken_quads']),
+    'get_neighbors': (bench_get_neighbors, ['tri_grid', 'broken_quads']),
+    'ordered_edge_list': (bench_ordered_edge_list, ['tri_grid', 'star_lattice']),
+    'neighbor_star_points': (bench_neighbor_star_points, ['tri_grid', 'star_lattice']),
+    'neighbor_star_points_batch': (bench_neighbor_star_points_batch, ['tri_grid', 'star_lattice']),
+    'edge_walker_step': (bench_edge_walker_step, ['tri_strips']),
+}
+
+SIZES = [1000, 10000, 100000, 1000000]
+
+
+def commit():
+    """The git commit of the add-on, or None outside a checkout."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(benchmarks=None, generators=None, sizes=None, sample=1000, repeat=3, log=None):
+    """Run the benchmarks and return the results as a JSON-ready dict.
+
+    Every benchmark runs on each of its generators at each size, `repeat`
+    times on `sample` elements; the fastest run is reported.
+    """
+    sizes = sizes or SIZES
+    results = []
+    for size in sizes:
+        for gen_name, generator in GENERATORS.items():
+            if generators and gen_name not in generators:
+                continue
+            wanted = [name for name, (_, gens) in BENCHMARKS.items()
+                      if gen_name in gens and (not benchmarks or name in benchmarks)]
+            if not wanted:
+                continue
+
+            start = time.perf_counter()
+            mesh = generator(size)
+            build = time.perf_counter() - start
+            mesh.topology()
+            if log:
+                log("%s %d: %d faces, built in %.3fs" % (gen_name, size, len(mesh.faces), build))
+
+            for name in wanted:
+                func = BENCHMARKS[name][0]
+                runs = [func(mesh, sample) for _ in range(repeat)]
+                calls, seconds = min(runs, key=lambda r: r[1])
+                results.append({
+                    'benchmark': name,
+                    'generator': gen_name,
+                    'size': size,
+                    'verts': len(mesh.verts),
+                    'edges': len(mesh.edges),
+                    'faces': len(mesh.faces),
+                    'calls': calls,
+                    'seconds': seconds,
+                    'per_call_us': seconds / max(calls, 1) * 1e6,
+                    'build_seconds': build,
+                })
+                if log:
+                    log("  %-28s %10.2f us/call" % (name, results[-1]['per_call_us']))
+
+    return {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sample': sample,
+        'repeat': repeat,
+        'results': results,
+    }
@@ -0,0 +1,35 @@
+import argparse
+import json
+import sys
+
+import Benchmarks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Benchmarks", description=Benchmarks.__doc__)
+    parser.add_argument("--benchmark", action="append", choices=sorted(Benchmarks.BENCHMARKS),
+                        help="only run this benchmark, can be repeated")
+    parser.add_argument("--generator", action="append", choices=sorted(Benchmarks.GENERATORS),
+                        help="only use this mesh generator, can be repeated")
+    parser.add_argument("--size", action="append", type=int,
+                        help="approximate face count, can be repeated (default: %s)"
+                             % " ".join(str(s) for s in Benchmarks.SIZES))
+    parser.add_argument("--sample", type=int, default=1000, help="calls per benchmark run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--output", "-o", help="write the JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    result = Benchmarks.run(args.benchmark, args.generator, args.size, args.sample, args.repeat, log)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+End-to-end operator scaling suite.
+
+Runs every operator of the add-on on generated meshes of growing size inside
+Blender, fits the empirical complexity exponent (the slope of log time over
+log face count) and compares it and the absolute timings with a stored
+baseline:
+
+    blender --background --factory-startup --python-exit-code 1 \\
+        --python Benchmarks/scaling.py -- --baseline Benchmarks/baseline.json
+
+Pass --write-baseline to store the current results as the new baseline.
+Blender exits with status 1 when an operator regressed or is missing from the
+baseline, and when there is no baseline to compare with: baselines are
+machine specific, so create one with --write-baseline on the machine that
+runs the suite.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import bpy
+
+import Benchmarks
+import AdvEdgeSelect
+import FixQuads
+import FixQuadStrip
+import SelectLinkedQuads
+import StarPoints
+import ZigZagSelect
+
+MODULES = [AdvEdgeSelect, FixQuads, FixQuadStrip, SelectLinkedQuads, StarPoints, ZigZagSelect]
+
+SIZES = [1000, 4000, 16000, 64000]
+
+
+def select(me, verts=(), edges=(), faces=()):
+    """Select exactly the given element indices of `me`, flushing face selection down to verts and edges."""
+    vert_mask = np.zeros(len(me.vertices), dtype=bool)
+    edge_mask = np.zeros(len(me.edges), dtype=bool)
+    face_mask = np.zeros(len(me.polygons), dtype=bool)
+    face_mask[list(faces)] = True
+    edge_mask[list(edges)] = True
+    vert_mask[list(verts)] = True
+
+    edge_verts = np.empty(len(me.edges) * 2, dtype=np.int64)
+    me.edges.foreach_get("vertices", edge_verts)
+    loop_verts = np.empty(len(me.loops), dtype=np.int64)
+    loop_edges = np.empty(len(me.loops), dtype=np.int64)
+    loop_total = np.empty(len(me.polygons), dtype=np.int64)
+    me.loops.foreach_get("vertex_index", loop_verts)
+    me.loops.foreach_get("edge_index", loop_edges)
+    me.polygons.foreach_get("loop_total", loop_total)
+    selected_loops = np.repeat(face_mask, loop_total)
+    edge_mask[loop_edges[selected_loops]] = True
+    vert_mask[loop_verts[selected_loops]] = True
+    vert_mask[edge_verts.reshape(-1, 2)[edge_mask].ravel()] = True
+
+    me.vertices.foreach_set("select", vert_mask)
+    me.edges.foreach_set("select", edge_mask)
+    me.polygons.foreach_set("select", face_mask)
+
+
+def quad_faces(me):
+    total = np.empty(len(me.polygons), dtype=np.int64)
+    me.polygons.foreach_get("loop_total", total)
+    return np.flatnonzero(total == 4)
+
+
+def interior_edge(me):
+    """An edge with two faces near the middle of the mesh."""
+    loop_edges = np.empty(len(me.loops), dtype=np.int64)
+    me.loops.foreach_get("edge_index", loop_edges)
+    interior = np.flatnonzero(np.bincount(loop_edges, minlength=len(me.edges)) == 2)
+    return int(interior[len(interior) // 2])
+
+
+def triangle_edge_pair(me):
+    """Two edges of a triangle near the middle of the mesh, as a zigzag seed."""
+    poly = me.polygons[len(me.polygons) // 2]
+    return [me.loops[l].edge_index for l in poly.loop_indices][:2]
+
+
+# name -> (operator call, generator, select(me) setup)
+CASES = {
+    'object.fix_quads': (
+        lambda: bpy.ops.object.fix_quads(mode='EXPLORE'), Benchmarks.broken_quads,
+        lambda me: select(me, faces=quad_faces(me))),
+    'object.fix_quads(MATCH)': (
+        lambda: bpy.ops.object.fix_quads(mode='MATCH'), Benchmarks.tri_grid,
+        lambda me: select(me)),
+    'object.fix_quad_strip': (
+        lambda: bpy.ops.object.fix_quad_strip(), lambda faces: Benchmarks.tri_strips(faces, length=faces // 2),
+        lambda me: select(me, faces=range(len(me.polygons)))),
+    'object.tri_strip_to_quad_strip': (
+        lambda: bpy.ops.object.tri_strip_to_quad_strip(), lambda faces: Benchmarks.tri_strips(faces, length=faces // 2),
+        lambda me: select(me, faces=range(len(me.polygons)))),
+    'object.select_linked_quads': (
+        lambda: bpy.ops.object.select_linked_quads(), Benchmarks.broken_quads,
+        lambda me: select(me, faces=[len(me.polygons) // 2])),
+    'edge.zigzag': (
+        lambda: bpy.ops.edge.zigzag(), Benchmarks.tri_grid,
+        lambda me: select(me, edges=triangle_edge_pair(me))),
+    'object.adv_edge_select': (
+        lambda: bpy.ops.object.adv_edge_select(), lambda faces: Benchmarks.broken_quads(faces, broken=0),
+        lambda me: select(me, edges=[interior_edge(me)])),
+    'object.select_star_points': (
+        lambda: bpy.ops.object.select_star_points(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=[0])),
+    'object.select_star_points_small': (
+        lambda: bpy.ops.object.select_star_points_small(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=[0])),
+    'object.select_all_star_points': (
+        lambda: bpy.ops.object.select_all_star_points(), Benchmarks.star_lattice,
+        lambda me: select(me)),
+    'object.select_star_edges': (
+        lambda: bpy.ops.object.select_star_edges(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=range(12))),
+    'object.select_star_edges_small': (
+        lambda: bpy.ops.object.select_star_edges_small(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=range(12))),
+    'object.fix_star_mesh': (
+        lambda: bpy.ops.object.fix_star_mesh(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=[0])),
+    'object.fix_star_mesh_small': (
+        lambda: bpy.ops.object.fix_star_mesh_small(), Benchmarks.star_lattice,
+        lambda me: select(me, verts=[0])),
+}
+
+
+def make_object(generator, size):
+    co, faces = generator(size).to_pydata()
+    me = bpy.data.meshes.new("scaling")
+    me.from_pydata(co.tolist(), [], faces)
+    me.update()
+    obj = bpy.data.objects.new("scaling", me)
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    return obj
+
+
+def remove_object(obj):
+    me = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(me)
+
+
+def time_case(name, size, repeat):
+    """Best of `repeat` runs of operator `name` on a fresh mesh of about `size` faces."""
+    call, generator, setup = CASES[name]
+    best = None
+    faces = 0
+    for _ in range(repeat):
+        obj = make_object(generator, size)
+        faces = len(obj.data.polygons)
+        setup(obj.data)
+        bpy.ops.object.mode_set(mode='EDIT')
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        bpy.ops.object.mode_set(mode='OBJECT')
+        remove_object(obj)
+        best = elapsed if best is None else min(best, elapsed)
+    return faces, best
+
+
+def exponent(faces, seconds):
+    """Slope of log(seconds) over log(faces)."""
+    return float(np.polyfit(np.log(faces), np.log(np.maximum(seconds, 1e-9)), 1)[0])
+
+
+def run(cases, sizes, repeat, log=print):
+    results = {}
+    for name in cases:
+        faces, seconds = [], []
+        for size in sizes:
+            f, s = time_case(name, size, repeat)
+            faces.append(f)
+            seconds.append(s)
+            log("%-32s %8d faces %10.4fs" % (name, f, s))
+        results[name] = {
+            'sizes': list(sizes),
+            'faces': faces,
+            'seconds': seconds,
+            'exponent': exponent(faces, seconds),
+        }
+        log("%-32s exponent %.2f" % (name, results[name]['exponent']))
+    return results
+
+
+def compare(results, baseline, exponent_tolerance, time_tolerance):
+    """Return messages for every case whose exponent or timings regressed against `baseline`.
+
+    A case missing from the baseline fails too, so a new or renamed operator
+    cannot slip through unmeasured.
+    """
+    failures = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            failures.append("%s: not in the baseline, run with --write-baseline to add it" % name)
+            continue
+        if result['exponent'] > base['exponent'] + exponent_tolerance:
+            failures.append("%s: exponent %.2f, baseline %.2f" % (name, result['exponent'], base['exponent']))
+        base_times = dict(zip(base['sizes'], base['seconds']))
+        for size, seconds in zip(result['sizes'], result['seconds']):
+            limit = base_times.get(size)
+            if limit is not None and seconds > limit * (1 + time_tolerance):
+                failures.append("%s: %.4fs at size %d, baseline %.4fs" % (name, seconds, size, limit))
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender --background --python Benchmarks/scaling.py --",
+                                     description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="only run this operator case")
+    parser.add_argument("--size", action="append", type=int, help="approximate face count, can be repeated")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the fastest is kept")
+    parser.add_argument("--baseline", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "baseline.json"))
+    parser.add_argument("--write-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--exponent-tolerance", type=float, default=0.25)
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="allowed slowdown as a fraction of the baseline time")
+    parser.add_argument("--output", "-o", help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    for module in MODULES:
+        module.register()
+    try:
+        results = run(args.case or list(CASES), sorted(args.size or SIZES), args.repeat)
+    finally:
+        for module in MODULES:
+            module.unregister()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.write_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print("Wrote baseline %s" % args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s, run with --write-baseline to create one" % args.baseline)
+        return 1
+    with open(args.baseline) as f:
+        failures = compare(results, json.load(f), args.exponent_tolerance, args.time_tolerance)
+    for failure in failures:
+        print("FAILED " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
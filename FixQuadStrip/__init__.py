@@ -1,5 +1,3 @@
-from typing import List
-
 bl_info = {
     "name": "Fix quad strip",
     "category": "Object",
@@ -8,6 +6,12 @@ bl_info = {
 import bpy
 import bmesh
 
+import Instrumentation
+import Loader
+
+Topology = Loader.lazy("Topology")
+quads = Loader.lazy("MeshKernel.quads")
+
 
 class FixQuadStrip(bpy.types.Operator):
     """Tooltip"""
@@ -18,44 +22,29 @@ class FixQuadStrip(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         obj = context.active_object
 
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(obj.data)
-        faces = [i for i in bm.faces if i.select]
+        Topology.lookup(bm)
+        links = quads.strip_links(topo, Topology.read_selection(obj.data.polygons))
 
         bpy.ops.mesh.select_all(action='DESELECT')
         bpy.ops.mesh.select_mode(use_extend=False, use_expand=False, type='EDGE')
 
-        # print(faces)
-        count = 10000
-        while count > 0:
-            count -= 1
-
-            for face in faces:
-                # count neighboring selected faces.
-                selected_neighbors = 0
-                middle_edge = None
-                other_face = None
-                for edge in face.edges:
-                    for neighbor in edge.link_faces:
-                        if neighbor == face:
-                            continue
-                        if neighbor in faces:
-                            selected_neighbors += 1
-                            middle_edge = edge
-                            other_face = neighbor
-
-                if selected_neighbors == 1:
-                    middle_edge.select = True
-                    faces.remove(face)
-                    faces.remove(other_face)
-                    break
-            else:
-                print("Failed to find end to cleanup.")
-                break
-        print(count)
+        edges, leftover = quads.pair_strip(links)
+        for e in edges:
+            bm.edges[e].select = True
+
+        if any(d >= 2 for d in leftover.values()):
+            self.report({'WARNING'}, "Strip is a cycle, %d faces left unpaired" % len(leftover))
+        elif leftover:
+            self.report({'WARNING'}, "Strip has odd length, %d face(s) left unpaired" % len(leftover))
+
         bpy.ops.mesh.dissolve_edges()
+        Topology.invalidate(obj.data)
         return {'FINISHED'}
 
 
@@ -0,0 +1,224 @@
+"""
+Operator instrumentation.
+
+Timers, counters, high-water marks and leveled trace events for the
+operators, collected per operator run in a `Session`. Disabled by default;
+turn it on with `enable()` or by setting SNAIL_INSTRUMENT=1 in the
+environment.
+
+While disabled `current()` returns None and the module level helpers return
+right away, so call sites fetch the session once outside their loops:
+
+    rec = Instrumentation.current()
+    for face in faces:
+        if rec:
+            rec.count('faces')
+
+Operators wrap `execute` with `@Instrumentation.operator`, which opens a
+session for the run and reports its summary through `self.report`. The same
+decorator runs the hooks added with `add_hook()` around every execute,
+whether or not instrumentation is enabled; the profiler and the scoped
+debugger tracing in RemoteDebugger use them.
+"""
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING'}
+
+# Trace events kept per session.
+TRACE_SIZE = 256
+# Finished sessions kept for inspection.
+HISTORY_SIZE = 32
+
+_enabled = os.environ.get("SNAIL_INSTRUMENT", "") not in ("", "0")
+_level = DEBUG
+_stack = []
+history = deque(maxlen=HISTORY_SIZE)
+# Callables hook(operator) returning a context manager to run the execute in, or None.
+# They get the running operator so they can check its bl_idname and report through it.
+hooks = []
+
+
+class Session(object):
+    """Everything recorded during one operator run."""
+
+    def __init__(self, name, level=DEBUG):
+        self.name = name
+        self.level = level
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.peaks = {}
+        self.events = deque(maxlen=TRACE_SIZE)
+        self.dropped = 0
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def peak(self, name, value):
+        """Keep the highest `value` seen for `name`."""
+        if value > self.peaks.get(name, value - 1):
+            self.peaks[name] = value
+
+    def merge(self, stats, peaks=()):
+        """Add a dict of counts, taking the keys in `peaks` as high-water marks."""
+        for name, value in stats.items():
+            if name in peaks:
+                self.peak(name, value)
+            else:
+                self.count(name, value)
+
+    def timer(self, name):
+        return _Timer(self, name)
+
+    def trace(self, level, message, *args):
+        """Record an event. `message % args` is only formatted when the events are read."""
+        if level < self.level:
+            return
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append((time.perf_counter() - self.start, level, message, args))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.start
+
+    def format_events(self):
+        return ["%8.4fs %-7s %s" % (t, LEVEL_NAMES.get(level, level), message % args if args else message)
+                for t, level, message, args in self.events]
+
+    def summary(self):
+        """One line: total time, sub timers, counters, peaks and the trace event count."""
+        parts = ["%s %.3fs" % (self.name, self.elapsed if self.elapsed is not None else 0.0)]
+        if self.timers:
+            parts.append(", ".join("%s %.3fs" % item for item in sorted(self.timers.items())))
+        if self.counters:
+            parts.append(", ".join("%s %d" % item for item in sorted(self.counters.items())))
+        if self.peaks:
+            parts.append(", ".join("%s peak %d" % item for item in sorted(self.peaks.items())))
+        if self.events:
+            warnings = sum(1 for event in self.events if event[1] >= WARNING)
+            parts.append("%d events (%d warnings, %d dropped)" % (len(self.events), warnings, self.dropped))
+        return " | ".join(parts)
+
+
+class _Timer(object):
+    __slots__ = ('session', 'name', 'start')
+
+    def __init__(self, session, name):
+        self.session = session
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.session.timers[self.name] += time.perf_counter() - self.start
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_timer = _NullTimer()
+
+
+def enable(flag=True, level=DEBUG):
+    global _enabled, _level
+    _enabled = flag
+    _level = level
+
+
+def enabled():
+    return _enabled
+
+
+def current():
+    """The session of the innermost running operator, or None when disabled or outside an operator."""
+    return _stack[-1] if _stack else None
+
+
+def count(name, n=1):
+    if _stack:
+        _stack[-1].count(name, n)
+
+
+def peak(name, value):
+    if _stack:
+        _stack[-1].peak(name, value)
+
+
+def trace(level, message, *args):
+    if _stack:
+        _stack[-1].trace(level, message, *args)
+
+
+def timer(name):
+    """A context manager timing its block into the current session, a no-op without one."""
+    return _stack[-1].timer(name) if _stack else _null_timer
+
+
+def begin(name):
+    """Open a session for `name` and make it current. Returns None when disabled."""
+    if not _enabled:
+        return None
+    session = Session(name, _level)
+    _stack.append(session)
+    return session
+
+
+def end(session):
+    session.finish()
+    _stack.remove(session)
+    history.append(session)
+
+
+def add_hook(hook):
+    if hook not in hooks:
+        hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def operator(execute):
+    """Decorator for Operator.execute: run the hooks, record the run in a session and report its summary."""
+
+    def run(self, context):
+        session = begin(self.bl_idname)
+        if session is None:
+            return execute(self, context)
+        try:
+            return execute(self, context)
+        finally:
+            end(session)
+            self.report({'INFO'}, session.summary())
+
+    def wrapper(self, context):
+        if not hooks:
+            return run(self, context)
+        with ExitStack() as stack:
+            # Copy, a hook may remove itself.
+            for hook in list(hooks):
+                manager = hook(self)
+                if manager is not None:
+                    stack.enter_context(manager)
+            return run(self, context)
+
+    wrapper.__name__ = execute.__name__
+    wrapper.__doc__ = execute.__doc__
+    wrapper.__wrapped__ = execute
+    return wrapper
@@ -0,0 +1,161 @@
+"""
+Profiling of operator runs.
+
+`profile_next(count, directory)` installs an Instrumentation hook that
+profiles the next `count` runs of the instrumented operators and writes one
+file per run to `directory`:
+
+- sampling (the default): a background thread samples the stack of the
+  operator's thread every `interval` seconds through sys._current_frames()
+  and writes the collapsed stacks to `<bl_idname>-<time>-<run>.folded`, one
+  "outer;...;inner count" line per distinct stack. flamegraph.pl, speedscope
+  and inferno read these. The cost is one stack walk per sample, so it does
+  not depend on how much Python the operator runs.
+- cProfile: a deterministic profile written as `.pstats`, used when sampling
+  is turned off or the interpreter has no sys._current_frames().
+
+Where a profile was written is reported through the profiled operator.
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import Instrumentation
+
+# Seconds between samples. The sampler needs the GIL to read the stack, and a
+# busy operator thread only hands it over every sys.getswitchinterval()
+# (5ms by default), so shorter intervals do not give more samples.
+INTERVAL = 0.005
+
+
+def can_sample():
+    return hasattr(sys, '_current_frames')
+
+
+class SamplingProfiler(object):
+    """Samples the stack of the thread that called start() from a background thread."""
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        # Stack of code objects, innermost first -> sample count.
+        self.samples = Counter()
+        self._target = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snail-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        target = self._target
+        samples = self.samples
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                samples[tuple(stack)] += 1
+
+    def collapsed(self):
+        """The samples as collapsed stack lines, outermost frame first."""
+        labels = {}
+        lines = []
+        for stack, n in self.samples.most_common():
+            names = []
+            for code in reversed(stack):
+                label = labels.get(code)
+                if label is None:
+                    label = "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+                    label = labels[code] = label.replace(";", ":")
+                names.append(label)
+            lines.append("%s %d" % (";".join(names), n))
+        return lines
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+
+
+class ProfileHook(object):
+    """Instrumentation hook profiling the next `count` operator runs; removes itself when done."""
+
+    def __init__(self, count, directory, sampling=True, interval=INTERVAL):
+        self.count = count
+        self.remaining = count
+        self.directory = directory
+        self.sampling = sampling and can_sample()
+        self.interval = interval
+        self.written = []
+
+    def __call__(self, operator):
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+        if self.remaining == 0:
+            Instrumentation.remove_hook(self)
+        return self._profile(operator, self.count - self.remaining)
+
+    @contextmanager
+    def _profile(self, operator, run):
+        name = operator.bl_idname
+        stem = os.path.join(self.directory, "%s-%s-%d" % (name.replace(".", "_"), time.strftime("%Y%m%d-%H%M%S"), run))
+        if self.sampling:
+            profiler = SamplingProfiler(self.interval)
+            profiler.start()
+            path = stem + ".folded"
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            path = stem + ".pstats"
+        try:
+            yield
+        finally:
+            if self.sampling:
+                profiler.stop()
+                profiler.write_folded(path)
+            else:
+                profiler.disable()
+                profiler.dump_stats(path)
+            self.written.append(path)
+            operator.report({'INFO'}, "Wrote profile to %s" % path)
+
+
+def active():
+    """The installed ProfileHook, or None."""
+    for hook in Instrumentation.hooks:
+        if isinstance(hook, ProfileHook):
+            return hook
+    return None
+
+
+def profile_next(count, directory, sampling=True, interval=INTERVAL):
+    """Profile the next `count` operator runs into `directory`, replacing a pending request."""
+    stop()
+    os.makedirs(directory, exist_ok=True)
+    hook = ProfileHook(count, directory, sampling, interval)
+    Instrumentation.add_hook(hook)
+    return hook
+
+
+def stop():
+    """Drop the pending profile request. Returns the number of runs it had left."""
+    hook = active()
+    if hook is None:
+        return 0
+    Instrumentation.remove_hook(hook)
+    return hook.remaining
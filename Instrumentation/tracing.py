@@ -0,0 +1,105 @@
+"""
+Debugger tracing scoped to chosen operators.
+
+A debugger attached with pydevd.settrace() traces every Python line for the
+rest of the session. `scope(idnames)`, called right after attaching, takes
+the debugger's trace function (and its sys.monitoring events where the
+interpreter has them, Python 3.12+), switches them off, and installs an
+Instrumentation hook that switches them back on only while an operator in
+`idnames` executes. `unscope()` restores the session wide tracing.
+
+With sys.monitoring only the global events are suspended; local events the
+debugger set on single code objects, such as breakpoints, stay active.
+"""
+import sys
+import threading
+from contextlib import contextmanager
+
+import Instrumentation
+
+
+def _settrace(func):
+    # pydevd warns when sys.settrace is used behind its back; its own
+    # SetTrace does the same without the warning.
+    tracing = sys.modules.get('pydevd_tracing')
+    set_trace = getattr(tracing, 'SetTrace', None) or sys.settrace
+    set_trace(func)
+
+
+def _monitoring_tool():
+    """The sys.monitoring debugger tool id when a debugger claimed it, otherwise None."""
+    monitoring = getattr(sys, 'monitoring', None)
+    if monitoring is None or monitoring.get_tool(monitoring.DEBUGGER_ID) is None:
+        return None
+    return monitoring.DEBUGGER_ID
+
+
+class ScopedTrace(object):
+    """Instrumentation hook running the operators in `idnames` under the captured trace."""
+
+    def __init__(self, idnames):
+        self.idnames = frozenset(idnames)
+        self.trace = sys.gettrace()
+        self.thread_trace = threading.gettrace() if hasattr(threading, 'gettrace') else None
+        self.tool = _monitoring_tool()
+        self.events = sys.monitoring.get_events(self.tool) if self.tool is not None else 0
+
+    def suspend(self):
+        _settrace(None)
+        if self.tool is not None:
+            sys.monitoring.set_events(self.tool, 0)
+
+    def resume(self):
+        if self.tool is not None:
+            sys.monitoring.set_events(self.tool, self.events)
+        if self.trace is not None:
+            _settrace(self.trace)
+
+    def __call__(self, operator):
+        if operator.bl_idname not in self.idnames:
+            return None
+        return self._scope()
+
+    @contextmanager
+    def _scope(self):
+        self.resume()
+        try:
+            yield
+        finally:
+            self.suspend()
+
+
+def active():
+    """The installed ScopedTrace, or None."""
+    for hook in Instrumentation.hooks:
+        if isinstance(hook, ScopedTrace):
+            return hook
+    return None
+
+
+def scope(idnames):
+    """Limit the current tracing to the operators in `idnames`. Call right after the debugger attached."""
+    unscope(restore=False)
+    hook = ScopedTrace(idnames)
+    hook.suspend()
+    threading.settrace(None)
+    Instrumentation.add_hook(hook)
+    return hook
+
+
+def unscope(restore=True):
+    """Remove the scoped trace. Returns whether one was installed.
+
+    With `restore` the captured tracing is switched back on for the whole
+    session; without, it is dropped, as when the debugger just attached anew.
+    """
+    hook = active()
+    if hook is None:
+        return False
+    Instrumentation.remove_hook(hook)
+    if not restore:
+        return True
+    hook.resume()
+    if hook.thread_trace is not None:
+        threading.settrace(hook.thread_trace)
+    return True
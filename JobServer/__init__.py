@@ -0,0 +1,125 @@
+"""
+Headless job server protocol.
+
+One warm Blender process runs JobServer/server.py and takes mesh jobs over a
+localhost socket, so a job only pays for the mesh work and not for Blender's
+startup, the add-on registration and the first NumPy/MeshKernel imports:
+
+    blender --background --factory-startup --python JobServer/server.py -- --port 8765
+    python -m JobServer --load in.blend --operator object.fix_quads --save out.blend
+
+Messages are JSON objects, one per line, in both directions. A job:
+
+    {"id": "tile-3",
+     "load": "in.blend",                     # optional, keeps the open file when missing
+     "steps": [{"operator": "object.fix_quads",
+                "args": {"mode": "MATCH"},   # optional operator properties
+                "objects": ["Grid"],         # optional, every mesh object when missing
+                "select": "ALL"}],           # optional, ALL or NONE before the operator
+     "save": "out.blend"}                    # optional
+
+is answered with
+
+    {"id": "tile-3", "ok": true,
+     "steps": [{"operator": "object.fix_quads", "objects": 1, "result": ["FINISHED"], "seconds": 0.41}],
+     "timings": {"load": 0.08, "steps": 0.41, "save": 0.03, "total": 0.52}}
+
+or {"id": ..., "ok": false, "error": "..."}. {"command": "ping"} and
+{"command": "shutdown"} are answered with {"ok": true}, lines that are not
+JSON objects with {"ok": false, "error": "..."}.
+
+This module only holds the protocol, the socket loop and the client and
+runs under plain CPython; the bpy side is in server.py.
+"""
+import json
+import socket
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+def send(stream, message):
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def receive(stream):
+    """The next message from `stream`, or None at the end of the stream.
+
+    Raises ValueError for a line that is not a JSON object.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+    message = json.loads(line.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("expected a JSON object, not %s" % type(message).__name__)
+    return message
+
+
+def serve(handle, host=HOST, port=PORT, log=print):
+    """Answer messages with `handle(message) -> reply` until a shutdown command.
+
+    Connections are served one after the other, and the jobs of a connection
+    in order: Blender's data is not safe to touch from several threads.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    log("Job server listening on %s:%d" % server.getsockname()[:2])
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection, connection.makefile("rwb") as stream:
+                while True:
+                    try:
+                        message = receive(stream)
+                    except ValueError as e:
+                        send(stream, {'ok': False, 'error': "invalid message: %s" % e})
+                        continue
+                    if message is None:
+                        break
+                    if message.get('command') == 'shutdown':
+                        send(stream, {'id': message.get('id'), 'ok': True})
+                        return
+                    if message.get('command') == 'ping':
+                        send(stream, {'id': message.get('id'), 'ok': True})
+                        continue
+                    send(stream, handle(message))
+    finally:
+        server.close()
+
+
+class Client(object):
+    """Submits jobs to a running job server."""
+
+    def __init__(self, host=HOST, port=PORT, timeout=None):
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.socket.makefile("rwb")
+
+    def request(self, message):
+        send(self.stream, message)
+        reply = receive(self.stream)
+        if reply is None:
+            raise ConnectionError("job server closed the connection")
+        return reply
+
+    def submit(self, job):
+        return self.request(job)
+
+    def ping(self):
+        return self.request({'command': 'ping'})
+
+    def shutdown(self):
+        return self.request({'command': 'shutdown'})
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import sys
+
+import JobServer
+
+
+def read_jobs(path):
+    """Jobs from a JSON lines file, or stdin for "-"."""
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        return [json.loads(line) for line in f if line.strip()]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def absolute(job):
+    """Resolve the job's file paths against our directory, the server runs elsewhere."""
+    job = dict(job)
+    for key in ('load', 'save'):
+        if job.get(key):
+            job[key] = os.path.abspath(job[key])
+    return job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m JobServer", description=JobServer.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jobs", nargs="*", help="JSON lines files with one job per line, - for stdin")
+    parser.add_argument("--host", default=JobServer.HOST)
+    parser.add_argument("--port", type=int, default=JobServer.PORT)
+    parser.add_argument("--load", help="job from the command line: file to open")
+    parser.add_argument("--operator", action="append", default=[],
+                        help="job from the command line: operator to run on every mesh, can be repeated")
+    parser.add_argument("--save", help="job from the command line: file to save to")
+    parser.add_argument("--ping", action="store_true", help="check that the server answers")
+    parser.add_argument("--shutdown", action="store_true", help="stop the server after the jobs")
+    args = parser.parse_args(argv)
+
+    jobs = [job for path in args.jobs for job in read_jobs(path)]
+    if args.load or args.operator or args.save:
+        jobs.append({'load': args.load, 'steps': [{'operator': name} for name in args.operator], 'save': args.save})
+
+    failed = 0
+    with JobServer.Client(args.host, args.port) as client:
+        if args.ping:
+            print(json.dumps(client.ping()))
+        for job in jobs:
+            reply = client.submit(absolute(job))
+            failed += not reply.get('ok')
+            print(json.dumps(reply))
+        if args.shutdown:
+            print(json.dumps(client.shutdown()))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Job server, run inside Blender:
+
+    blender --background --factory-startup --python JobServer/server.py -- --port 8765
+
+Registers the add-on and imports its implementation once, then runs the jobs
+described in JobServer/__init__.py until a client sends a shutdown command.
+Topology caches survive between jobs; the entries of meshes freed by loading
+another file are dropped.
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import bpy
+
+import JobServer
+import Loader
+import Topology
+import AdvEdgeSelect
+import FixQuads
+import FixQuadStrip
+import SelectLinkedQuads
+import StarPoints
+import ZigZagSelect
+
+MODULES = [AdvEdgeSelect, FixQuads, FixQuadStrip, SelectLinkedQuads, StarPoints, ZigZagSelect]
+
+# Loaded at startup instead of by the first job.
+IMPLEMENTATION = ["numpy", "MeshKernel.quads", "MeshKernel.stars", "MeshKernel.edges"]
+
+
+def operator(idname):
+    """bpy.ops.<module>.<name> for "module.name"."""
+    module, name = idname.split(".")
+    return getattr(getattr(bpy.ops, module), name)
+
+
+def object_mode():
+    obj = bpy.context.view_layer.objects.active
+    if obj is not None and obj.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+
+@contextmanager
+def editing(obj):
+    """Edit `obj` alone, back in object mode afterwards."""
+    object_mode()
+    for other in bpy.context.view_layer.objects:
+        other.select_set(False)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    bpy.ops.object.mode_set(mode='EDIT')
+    try:
+        yield
+    finally:
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def run_step(step):
+    call = operator(step['operator'])
+    args = step.get('args', {})
+    select = step.get('select')
+    if select not in (None, 'ALL', 'NONE'):
+        raise ValueError("select must be ALL or NONE, not %r" % select)
+    names = step.get('objects')
+    if names:
+        objects = [bpy.data.objects[name] for name in names]
+    else:
+        objects = [obj for obj in bpy.context.view_layer.objects if obj.type == 'MESH']
+
+    result = set()
+    start = time.perf_counter()
+    for obj in objects:
+        with editing(obj):
+            if select is not None:
+                bpy.ops.mesh.select_all(action='SELECT' if select == 'ALL' else 'DESELECT')
+            result |= call(**args)
+    return {
+        'operator': step['operator'],
+        'objects': len(objects),
+        'result': sorted(result),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def run_job(job):
+    start = time.perf_counter()
+    timings = {}
+
+    if job.get('load'):
+        load_start = time.perf_counter()
+        bpy.ops.wm.open_mainfile(filepath=job['load'], load_ui=False)
+        Topology.retain(bpy.data.meshes)
+        timings['load'] = time.perf_counter() - load_start
+
+    steps = [run_step(step) for step in job.get('steps', [])]
+    timings['steps'] = sum(step['seconds'] for step in steps)
+
+    if job.get('save'):
+        save_start = time.perf_counter()
+        object_mode()
+        bpy.ops.wm.save_as_mainfile(filepath=job['save'])
+        timings['save'] = time.perf_counter() - save_start
+
+    timings['total'] = time.perf_counter() - start
+    return {'id': job.get('id'), 'ok': True, 'steps': steps, 'timings': timings}
+
+
+def handle(job, log=print):
+    try:
+        reply = run_job(job)
+    except Exception as e:
+        # A failed job must not take the server down, nor a failure to recover from it.
+        reply = {'id': job.get('id'), 'ok': False, 'error': "%s: %s" % (type(e).__name__, e)}
+        log("Job %s failed: %s" % (job.get('id'), reply['error']))
+        try:
+            object_mode()
+        except Exception as e:
+            log("Job %s: could not return to object mode: %s: %s" % (job.get('id'), type(e).__name__, e))
+    else:
+        log("Job %s done in %.3fs" % (job.get('id'), reply['timings']['total']))
+    return reply
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender --background --python JobServer/server.py --",
+                                     description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=JobServer.HOST)
+    parser.add_argument("--port", type=int, default=JobServer.PORT)
+    args = parser.parse_args(argv)
+
+    with Loader.timed("register"):
+        for module in MODULES:
+            module.register()
+    for name in IMPLEMENTATION:
+        Loader.timed_import(name)
+    print("Startup: " + Loader.summary())
+
+    try:
+        JobServer.serve(handle, args.host, args.port)
+    finally:
+        for module in MODULES:
+            module.unregister()
+    return 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
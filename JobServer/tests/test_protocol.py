@@ -0,0 +1,80 @@
+"""serve() driven through Client with a stub handler, under plain CPython:
+
+    python -m pytest
+"""
+import os
+import sys
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import JobServer
+
+
+class ServeTest(unittest.TestCase):
+    def setUp(self):
+        self.jobs = []
+        listening = threading.Event()
+        address = []
+
+        def handle(job):
+            self.jobs.append(job)
+            return {'id': job.get('id'), 'ok': True}
+
+        def log(message):
+            # "Job server listening on host:port"
+            if not address:
+                address.append(int(message.rsplit(":", 1)[1]))
+                listening.set()
+
+        self.thread = threading.Thread(target=JobServer.serve, args=(handle, "127.0.0.1", 0, log), daemon=True)
+        self.thread.start()
+        self.assertTrue(listening.wait(10))
+        self.port = address[0]
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            with JobServer.Client(port=self.port, timeout=10) as client:
+                client.shutdown()
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+
+    def raw(self, client, line):
+        client.stream.write(line + b"\n")
+        client.stream.flush()
+        return JobServer.receive(client.stream)
+
+    def test_jobs_in_order(self):
+        with JobServer.Client(port=self.port, timeout=10) as client:
+            self.assertEqual(client.ping(), {'id': None, 'ok': True})
+            self.assertEqual(client.submit({'id': 'a'}), {'id': 'a', 'ok': True})
+            self.assertEqual(client.submit({'id': 'b', 'steps': []}), {'id': 'b', 'ok': True})
+        self.assertEqual(self.jobs, [{'id': 'a'}, {'id': 'b', 'steps': []}])
+
+    def test_bad_lines_do_not_stop_the_server(self):
+        with JobServer.Client(port=self.port, timeout=10) as client:
+            for line in (b"not json", b"[]", b"1", b"\"job\"", b"null"):
+                reply = self.raw(client, line)
+                self.assertFalse(reply['ok'], line)
+                self.assertIn('error', reply)
+            self.assertEqual(client.submit({'id': 'c'}), {'id': 'c', 'ok': True})
+        self.assertEqual(self.jobs, [{'id': 'c'}])
+
+    def test_connections_one_after_the_other(self):
+        for name in ('first', 'second'):
+            with JobServer.Client(port=self.port, timeout=10) as client:
+                self.assertEqual(client.submit({'id': name}), {'id': name, 'ok': True})
+        self.assertEqual([job['id'] for job in self.jobs], ['first', 'second'])
+
+    def test_shutdown(self):
+        with JobServer.Client(port=self.port, timeout=10) as client:
+            self.assertEqual(client.request({'command': 'shutdown', 'id': 7}), {'id': 7, 'ok': True})
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Deferred imports and import timing.
+
+`lazy(name)` returns a stand-in for module `name` that imports it on first
+attribute access. The operator modules pull in NumPy and the implementation
+packages (Topology, MeshKernel) through it, so registering the add-on only
+costs the operator classes; the rest loads the first time an operator runs.
+
+Imports and registrations done through this module are timed into
+`timings`, see `summary()`.
+"""
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+# name -> seconds, in the order things were loaded.
+timings = {}
+
+
+def record(name, seconds):
+    timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed_import(name):
+    """importlib.import_module, timed into `timings` unless the module was already loaded."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with timed(name):
+        return importlib.import_module(name)
+
+
+class LazyModule(object):
+    """Imports module `name` on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self.__dict__['_module'] = timed_import(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return "<lazy module %r%s>" % (self._name, "" if self._module is None else " (loaded)")
+
+
+def lazy(name):
+    return LazyModule(name)
+
+
+def summary():
+    """One line with the time of every timed import and registration, slowest first."""
+    items = sorted(timings.items(), key=lambda item: -item[1])
+    return ", ".join("%s %.1fms" % (name, seconds * 1000) for name, seconds in items)
@@ -0,0 +1,784 @@
+"""
+Headless mesh kernel.
+
+A small BMesh-like mesh that runs under plain CPython. Elements live in
+growable NumPy tables the way BMesh stores them: every vert has a disk cycle
+of edges, every edge a radial cycle of loops, every face a cycle of loops
+(the half-edges). `Vert`, `Edge`, `Face` and `Loop` are thin wrappers around
+a row with the BMesh attributes the algorithms use (`index`, `verts`,
+`edges`, `link_edges`, `link_faces`, `select`, `is_valid`).
+
+As in BMesh, `index` is a stored attribute: removing elements leaves holes
+in the tables, and `index_update()` renumbers the live elements densely
+without moving them, so wrappers stay valid. Only the explicit
+`Mesh.compact()` moves rows to drop the holes, which invalidates every
+wrapper taken before it.
+
+The editing operations mirror their bmesh counterparts and are exposed as
+`ops` and `utils`, so algorithms pick theirs with `backend(mesh)` and run
+unchanged on a `Mesh` or on a real BMesh. `Mesh.topology()` hands the mesh to
+the `Topology` array code with the same indices as the elements.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+import Topology
+
+
+class _Table(object):
+    """Parallel NumPy columns that grow by doubling. Rows are not reused until compaction.
+
+    Every table has an `index` column, the element index that
+    index_update() assigns. New rows are numbered by row until then.
+    """
+
+    def __init__(self, **columns):
+        # name -> (row shape, dtype, fill value)
+        columns['index'] = ((), np.int64, -1)
+        self.columns = columns
+        self.count = 0
+        self.capacity = 0
+        for name, (shape, dtype, fill) in columns.items():
+            setattr(self, name, np.full((0,) + shape, fill, dtype=dtype))
+
+    def add(self, n=1):
+        """Append `n` rows and return the index of the first one."""
+        start = self.count
+        if start + n > self.capacity:
+            capacity = max(16, 2 * self.capacity, start + n)
+            for name, (shape, dtype, fill) in self.columns.items():
+                column = np.full((capacity,) + shape, fill, dtype=dtype)
+                column[:start] = getattr(self, name)[:start]
+                setattr(self, name, column)
+            self.capacity = capacity
+        self.count += n
+        self.alive[start:start + n] = True
+        self.index[start:start + n] = np.arange(start, start + n)
+        return start
+
+    def rows(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    def take(self, keep, remap):
+        """Keep only the rows `keep`, passing reference columns through their `remap` array."""
+        for name in self.columns:
+            column = getattr(self, name)[keep]
+            if name in remap:
+                column = remap[name][column]
+            setattr(self, name, column)
+        self.index = np.arange(len(keep), dtype=np.int64)
+        self.count = self.capacity = len(keep)
+
+    def index_update(self):
+        """Number the live rows 0..n-1 in row order."""
+        rows = self.rows()
+        self.index[rows] = np.arange(len(rows))
+        return rows
+
+
+def _remap(keep, count):
+    """Old row -> new row for the rows in `keep`, with -1 (the extra last slot) kept as -1."""
+    out = np.full(count + 1, -1, dtype=np.int64)
+    out[keep] = np.arange(len(keep))
+    return out
+
+
+class _Elem(object):
+    __slots__ = ('mesh', 'row', '_generation')
+    _table = None
+
+    def __init__(self, mesh, row):
+        self.mesh = mesh
+        self.row = int(row)
+        self._generation = mesh.generation
+
+    def __eq__(self, other):
+        return (type(other) is type(self) and other.mesh is self.mesh and other.row == self.row
+                and other._generation == self._generation)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), id(self.mesh), self.row, self._generation))
+
+    def __repr__(self):
+        return "<%s %d%s>" % (type(self).__name__, self.row, "" if self.is_valid else " dead")
+
+    @property
+    def _data(self):
+        return getattr(self.mesh, self._table)
+
+    @property
+    def index(self):
+        return int(self._data.index[self._check()])
+
+    @property
+    def is_valid(self):
+        return self._generation == self.mesh.generation and bool(self._data.alive[self.row])
+
+    def _check(self):
+        """The row of this element, raising ReferenceError if it was removed or compacted away."""
+        if not self.is_valid:
+            raise ReferenceError("%r has been removed" % self)
+        return self.row
+
+    @property
+    def select(self):
+        return bool(self._data.select[self._check()])
+
+    @select.setter
+    def select(self, value):
+        self._data.select[self._check()] = value
+
+
+class Vert(_Elem):
+    __slots__ = ()
+    _table = 'vert_data'
+
+    @property
+    def co(self):
+        return self.mesh.vert_data.co[self._check()]
+
+    @property
+    def link_edges(self):
+        return [Edge(self.mesh, e) for e in self.mesh.disk(self._check())]
+
+    @property
+    def link_faces(self):
+        mesh = self.mesh
+        v = self._check()
+        faces = []
+        for e in mesh.disk(v):
+            for l in mesh.radial(e):
+                if mesh.loop_data.vert[l] == v:
+                    faces.append(mesh.loop_data.face[l])
+        return [Face(mesh, f) for f in dict.fromkeys(faces)]
+
+
+class Edge(_Elem):
+    __slots__ = ()
+    _table = 'edge_data'
+
+    @property
+    def verts(self):
+        a, b = self.mesh.edge_data.verts[self._check()]
+        return [Vert(self.mesh, a), Vert(self.mesh, b)]
+
+    @property
+    def link_faces(self):
+        mesh = self.mesh
+        return [Face(mesh, mesh.loop_data.face[l]) for l in mesh.radial(self._check())]
+
+    def other_vert(self, vert):
+        a, b = self.mesh.edge_data.verts[self._check()]
+        if vert.row == a:
+            return Vert(self.mesh, b)
+        if vert.row == b:
+            return Vert(self.mesh, a)
+        return None
+
+
+class Face(_Elem):
+    __slots__ = ()
+    _table = 'face_data'
+
+    @property
+    def verts(self):
+        mesh = self.mesh
+        return [Vert(mesh, mesh.loop_data.vert[l]) for l in mesh.face_loops(self._check())]
+
+    @property
+    def edges(self):
+        mesh = self.mesh
+        return [Edge(mesh, mesh.loop_data.edge[l]) for l in mesh.face_loops(self._check())]
+
+
+class Loop(_Elem):
+    """A face corner, running from `vert` along `edge`, like BMLoop."""
+    __slots__ = ()
+    _table = 'loop_data'
+
+    @property
+    def vert(self):
+        return Vert(self.mesh, self.mesh.loop_data.vert[self._check()])
+
+    @property
+    def edge(self):
+        return Edge(self.mesh, self.mesh.loop_data.edge[self._check()])
+
+    @property
+    def face(self):
+        return Face(self.mesh, self.mesh.loop_data.face[self._check()])
+
+    @property
+    def link_loop_next(self):
+        return Loop(self.mesh, self.mesh.loop_data.next[self._check()])
+
+    @property
+    def link_loop_prev(self):
+        return Loop(self.mesh, self.mesh.loop_data.prev[self._check()])
+
+    @property
+    def link_loop_radial_next(self):
+        return Loop(self.mesh, self.mesh.loop_data.radial[self._check(), 1])
+
+
+class _Seq(object):
+    """bm.verts / bm.edges / bm.faces."""
+
+    def __init__(self, mesh, elem, table):
+        self.mesh = mesh
+        self.elem = elem
+        self.table = table
+        # (mesh.edits, live rows) for seq[i].
+        self._lookup = None
+
+    @property
+    def _data(self):
+        return getattr(self.mesh, self.table)
+
+    def __len__(self):
+        return np.count_nonzero(self._data.alive[:self._data.count])
+
+    def __iter__(self):
+        generation = self.mesh.generation
+        for i in self._data.rows():
+            if self.mesh.generation != generation:
+                raise RuntimeError("mesh was compacted during iteration")
+            if self._data.alive[i]:
+                yield self.elem(self.mesh, i)
+
+    def __getitem__(self, i):
+        """The i-th live element. Unlike BMesh, an outdated lookup table is rebuilt instead of raising."""
+        rows = self.ensure_lookup_table()
+        if not 0 <= i < len(rows):
+            raise IndexError("%s index %d out of range" % (self.elem.__name__, i))
+        return self.elem(self.mesh, rows[i])
+
+    def ensure_lookup_table(self):
+        if self._lookup is None or self._lookup[0] != self.mesh.edits:
+            self._lookup = (self.mesh.edits, self._data.rows())
+        return self._lookup[1]
+
+    def index_update(self):
+        """Number the live elements densely, in the order of seq[i]. Rows don't move, wrappers stay valid."""
+        self._data.index_update()
+
+    def foreach_get(self, attr, out):
+        """Fill `out` with `attr` of the live elements, in index order."""
+        data = self._data
+        out[...] = getattr(data, attr)[data.rows()].reshape(out.shape)
+
+
+class Mesh(object):
+    """An editable polygon mesh stored BMesh-style in NumPy tables."""
+
+    def __init__(self):
+        self.vert_data = _Table(alive=((), bool, False), select=((), bool, False),
+                                co=((3,), np.float64, 0.0), edge=((), np.int64, -1))
+        # disk[e, side] is the (prev, next) edge around verts[e, side].
+        self.edge_data = _Table(alive=((), bool, False), select=((), bool, False),
+                                verts=((2,), np.int64, -1), disk=((2, 2), np.int64, -1),
+                                loop=((), np.int64, -1))
+        # A loop runs from `vert` along `edge`; radial is the (prev, next) loop on the same edge.
+        self.loop_data = _Table(alive=((), bool, False), vert=((), np.int64, -1), edge=((), np.int64, -1),
+                                face=((), np.int64, -1), next=((), np.int64, -1), prev=((), np.int64, -1),
+                                radial=((2,), np.int64, -1))
+        self.face_data = _Table(alive=((), bool, False), select=((), bool, False),
+                                loop=((), np.int64, -1), len=((), np.int64, 0))
+
+        # Bumped by compact(), which renumbers rows and so invalidates element wrappers.
+        self.generation = 0
+        # Bumped by every edit, for the lookup tables of seq[i].
+        self.edits = 0
+        self.compacted = True
+        self._topology = None
+
+        self.verts = _Seq(self, Vert, 'vert_data')
+        self.edges = _Seq(self, Edge, 'edge_data')
+        self.faces = _Seq(self, Face, 'face_data')
+
+    def _edited(self):
+        self.compacted = False
+        self.edits += 1
+        self._topology = None
+
+    # Cycles.
+
+    def _side(self, e, v):
+        return 0 if self.edge_data.verts[e, 0] == v else 1
+
+    def disk(self, v):
+        """Edge indices around vert `v`."""
+        first = e = self.vert_data.edge[v]
+        while e >= 0:
+            yield e
+            e = self.edge_data.disk[e, self._side(e, v), 1]
+            if e == first:
+                break
+
+    def radial(self, e):
+        """Loop indices along edge `e`."""
+        first = l = self.edge_data.loop[e]
+        while l >= 0:
+            yield l
+            l = self.loop_data.radial[l, 1]
+            if l == first:
+                break
+
+    def face_loops(self, f):
+        """Loop indices of face `f`, in order."""
+        first = l = self.face_data.loop[f]
+        while True:
+            yield l
+            l = self.loop_data.next[l]
+            if l == first:
+                break
+
+    def _disk_insert(self, e, v):
+        disk = self.edge_data.disk
+        first = self.vert_data.edge[v]
+        side = self._side(e, v)
+        if first < 0:
+            disk[e, side] = e
+            self.vert_data.edge[v] = e
+            return
+        first_side = self._side(first, v)
+        prev = disk[first, first_side, 0]
+        disk[e, side] = prev, first
+        disk[prev, self._side(prev, v), 1] = e
+        disk[first, first_side, 0] = e
+
+    def _disk_remove(self, e, v):
+        disk = self.edge_data.disk
+        prev, nxt = disk[e, self._side(e, v)]
+        if nxt == e:
+            self.vert_data.edge[v] = -1
+            return
+        disk[prev, self._side(prev, v), 1] = nxt
+        disk[nxt, self._side(nxt, v), 0] = prev
+        if self.vert_data.edge[v] == e:
+            self.vert_data.edge[v] = nxt
+
+    def _radial_insert(self, l, e):
+        radial = self.loop_data.radial
+        first = self.edge_data.loop[e]
+        self.loop_data.edge[l] = e
+        if first < 0:
+            radial[l] = l
+            self.edge_data.loop[e] = l
+            return
+        prev = radial[first, 0]
+        radial[l] = prev, first
+        radial[prev, 1] = l
+        radial[first, 0] = l
+
+    def _radial_remove(self, l):
+        radial = self.loop_data.radial
+        e = self.loop_data.edge[l]
+        prev, nxt = radial[l]
+        if nxt == l:
+            self.edge_data.loop[e] = -1
+            return
+        radial[prev, 1] = nxt
+        radial[nxt, 0] = prev
+        if self.edge_data.loop[e] == l:
+            self.edge_data.loop[e] = nxt
+
+    # Construction.
+
+    def find_edge(self, a, b):
+        """Index of the edge between verts `a` and `b`, or -1."""
+        for e in self.disk(a):
+            if b in self.edge_data.verts[e]:
+                return e
+        return -1
+
+    def new_vert(self, co=(0.0, 0.0, 0.0)):
+        v = self.vert_data.add()
+        self.vert_data.co[v] = co
+        self._edited()
+        return v
+
+    def new_edge(self, a, b):
+        if a == b:
+            raise ValueError("edge needs two different verts")
+        e = self.edge_data.add()
+        self.edge_data.verts[e] = a, b
+        self._disk_insert(e, a)
+        self._disk_insert(e, b)
+        self._edited()
+        return e
+
+    def new_face(self, verts):
+        """Add a face over vert indices `verts`, reusing existing edges."""
+        verts = [int(v) for v in verts]
+        if len(verts) < 3 or len(set(verts)) != len(verts):
+            raise ValueError("face needs at least 3 different verts")
+        f = self.face_data.add()
+        start = self.loop_data.add(len(verts))
+        n = len(verts)
+        for i, v in enumerate(verts):
+            w = verts[(i + 1) % n]
+            e = self.find_edge(v, w)
+            if e < 0:
+                e = self.new_edge(v, w)
+            l = start + i
+            self.loop_data.vert[l] = v
+            self.loop_data.face[l] = f
+            self.loop_data.next[l] = start + (i + 1) % n
+            self.loop_data.prev[l] = start + (i - 1) % n
+            self._radial_insert(l, e)
+        self.face_data.loop[f] = start
+        self.face_data.len[f] = n
+        self._edited()
+        return f
+
+    def _kill(self, table, i):
+        table.alive[i] = False
+        if hasattr(table, 'select'):
+            table.select[i] = False
+        self._edited()
+
+    # Maintenance.
+
+    def compact(self):
+        """Drop removed rows, renumber everything densely and store each face's loops contiguously.
+
+        Element wrappers taken before compaction become invalid.
+        """
+        if self.compacted:
+            return
+        vd, ed, ld, fd = self.vert_data, self.edge_data, self.loop_data, self.face_data
+        verts, edges, faces = vd.rows(), ed.rows(), fd.rows()
+        loops = self._face_loop_rows(faces)
+
+        vmap = _remap(verts, vd.count)
+        emap = _remap(edges, ed.count)
+        lmap = _remap(loops, ld.count)
+        fmap = _remap(faces, fd.count)
+        vd.take(verts, {'edge': emap})
+        ed.take(edges, {'verts': vmap, 'disk': emap, 'loop': lmap})
+        ld.take(loops, {'vert': vmap, 'edge': emap, 'face': fmap, 'next': lmap, 'prev': lmap, 'radial': lmap})
+        fd.take(faces, {'loop': lmap})
+
+        self.generation += 1
+        self.compacted = True
+        self.edits += 1
+        self._topology = None
+
+    def _face_loop_rows(self, faces):
+        """Loop rows of the face rows `faces`, face after face, each in loop order."""
+        fd, ld = self.face_data, self.loop_data
+        total = fd.len[faces]
+        start = np.cumsum(total) - total
+        loops = np.empty(total.sum(), dtype=np.int64)
+        cur = fd.loop[faces].copy()
+        for k in range(int(total.max(initial=0))):
+            m = k < total
+            loops[start[m] + k] = cur[m]
+            cur[m] = ld.next[cur[m]]
+        return loops
+
+    def topology(self):
+        """The mesh as a Topology.MeshTopology, with indices matching the elements.
+
+        Like `Topology.lookup(bm)` this runs index_update() on the elements,
+        it does not compact the mesh.
+        """
+        if self._topology is None:
+            vd, ed, fd = self.vert_data, self.edge_data, self.face_data
+            verts, edges, faces = vd.index_update(), ed.index_update(), fd.index_update()
+            loops = self._face_loop_rows(faces)
+            vmap = _remap(verts, vd.count)
+            emap = _remap(edges, ed.count)
+            total = fd.len[faces]
+            self._topology = Topology.MeshTopology(
+                len(verts), vmap[ed.verts[edges]], np.cumsum(total) - total, total,
+                vmap[self.loop_data.vert[loops]], emap[self.loop_data.edge[loops]])
+        return self._topology
+
+    def to_pydata(self):
+        """Return (coords, faces) of the live elements, faces as lists of vert indices."""
+        topo = self.topology()
+        faces = np.split(topo.loop_verts, topo.loop_start[1:]) if topo.num_faces else []
+        return self.vert_data.co[self.vert_data.rows()], [f.tolist() for f in faces]
+
+
+def edges_from_loops(num_verts, loop_start, loop_total, loop_verts):
+    """Derive (edge_verts, loop_edges) from face loops, one edge per distinct vert pair."""
+    loop_faces = np.repeat(np.arange(len(loop_start)), loop_total)
+    start = loop_start[loop_faces]
+    nxt = start + (np.arange(len(loop_verts)) - start + 1) % loop_total[loop_faces]
+    a = loop_verts
+    b = loop_verts[nxt]
+    keys, loop_edges = np.unique(np.minimum(a, b) * num_verts + np.maximum(a, b), return_inverse=True)
+    edge_verts = np.stack([keys // num_verts, keys % num_verts], axis=1)
+    return edge_verts, loop_edges.ravel()
+
+
+def _cycles(groups, count):
+    """For items grouped by `groups` (ids < count), return (order, prev, next) in group order.
+
+    prev and next link each item to its neighbors within its group, cyclically.
+    """
+    order = np.argsort(groups, kind='stable')
+    size = np.bincount(groups, minlength=count)
+    first = np.cumsum(size) - size
+    g = groups[order]
+    rank = np.arange(len(order)) - first[g]
+    nxt = np.empty(len(order), dtype=np.int64)
+    prev = np.empty(len(order), dtype=np.int64)
+    nxt[order] = order[first[g] + (rank + 1) % size[g]]
+    prev[order] = order[first[g] + (rank - 1) % size[g]]
+    return order, first, size, prev, nxt
+
+
+def from_arrays(num_verts, edge_verts, loop_start, loop_total, loop_verts, loop_edges, co=None):
+    """Build a Mesh from arrays in MeshTopology argument order, in one vectorized pass."""
+    mesh = Mesh()
+    num_edges = len(edge_verts)
+    num_loops = len(loop_verts)
+    num_faces = len(loop_start)
+    vd, ed, ld, fd = mesh.vert_data, mesh.edge_data, mesh.loop_data, mesh.face_data
+    vd.add(num_verts)
+    ed.add(num_edges)
+    ld.add(num_loops)
+    fd.add(num_faces)
+    if co is not None:
+        vd.co[:num_verts] = co
+
+    # Loops, stored contiguously per face.
+    loop_faces = np.repeat(np.arange(num_faces), loop_total)
+    start = loop_start[loop_faces]
+    offset = np.arange(num_loops) - start
+    total = loop_total[loop_faces]
+    ld.vert[:num_loops] = loop_verts
+    ld.edge[:num_loops] = loop_edges
+    ld.face[:num_loops] = loop_faces
+    ld.next[:num_loops] = start + (offset + 1) % total
+    ld.prev[:num_loops] = start + (offset - 1) % total
+    fd.loop[:num_faces] = loop_start
+    fd.len[:num_faces] = loop_total
+
+    # Radial cycles: the loops of each edge.
+    order, first, size, prev, nxt = _cycles(loop_edges, num_edges)
+    ld.radial[:num_loops, 0] = prev
+    ld.radial[:num_loops, 1] = nxt
+    ed.loop[:num_edges] = np.where(size > 0, order[np.minimum(first, max(num_loops - 1, 0))], -1)
+
+    # Disk cycles: the edge sides at each vert. Side s of edge e is item 2 * e + s.
+    verts = edge_verts.ravel()
+    order, first, size, prev, nxt = _cycles(verts, num_verts)
+    ed.verts[:num_edges] = edge_verts
+    ed.disk[:num_edges, :, 0] = (prev // 2).reshape(-1, 2)
+    ed.disk[:num_edges, :, 1] = (nxt // 2).reshape(-1, 2)
+    vd.edge[:num_verts] = np.where(size > 0, order[np.minimum(first, max(2 * num_edges - 1, 0))] // 2, -1)
+
+    mesh.compacted = True
+    return mesh
+
+
+def from_pydata(co, faces):
+    """Build a Mesh from vert coordinates and faces given as vert index lists."""
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    loop_total = np.array([len(f) for f in faces], dtype=np.int64)
+    loop_start = np.cumsum(loop_total) - loop_total
+    loop_verts = np.concatenate([np.asarray(f, dtype=np.int64) for f in faces]) if len(faces) else \
+        np.empty(0, dtype=np.int64)
+    edge_verts, loop_edges = edges_from_loops(len(co), loop_start, loop_total, loop_verts)
+    return from_arrays(len(co), edge_verts, loop_start, loop_total, loop_verts, loop_edges, co)
+
+
+def from_topology(topo: Topology.MeshTopology, co=None):
+    return from_arrays(topo.num_verts, topo.edge_verts, topo.loop_start, topo.loop_total, topo.loop_verts,
+                       topo.loop_edges, co)
+
+
+# Editing operations, named and called like their bmesh.ops / bmesh.utils counterparts.
+
+def _shared_edges(mesh, fa, fb):
+    return sum(1 for l in mesh.face_loops(fa) for r in mesh.radial(mesh.loop_data.edge[l])
+               if mesh.loop_data.face[r] == fb)
+
+
+def _join(mesh, la, lb):
+    """Merge the faces of loops `la` and `lb`, which run in opposite directions along one edge."""
+    ld, fd = mesh.loop_data, mesh.face_data
+    fa, fb = ld.face[la], ld.face[lb]
+    e = ld.edge[la]
+    for l in list(mesh.face_loops(fb)):
+        ld.face[l] = fa
+    pa, na, pb, nb = ld.prev[la], ld.next[la], ld.prev[lb], ld.next[lb]
+    ld.next[pa], ld.prev[nb] = nb, pa
+    ld.next[pb], ld.prev[na] = na, pb
+    fd.loop[fa] = pa
+    fd.len[fa] += fd.len[fb] - 2
+
+    for l in (la, lb):
+        mesh._radial_remove(l)
+        mesh._kill(ld, l)
+    a, b = mesh.edge_data.verts[e]
+    mesh._disk_remove(e, a)
+    mesh._disk_remove(e, b)
+    mesh._kill(mesh.edge_data, e)
+    mesh._kill(fd, fb)
+    return fa
+
+
+def _joinable(mesh, e):
+    """The two loops of `e` if its faces can be merged across it, else None."""
+    ld = mesh.loop_data
+    loops = list(mesh.radial(e))
+    if len(loops) != 2:
+        return None
+    la, lb = loops
+    fa, fb = ld.face[la], ld.face[lb]
+    # Same face on both sides, flipped normals, or faces touching along more than this edge.
+    if fa == fb or ld.vert[la] == ld.vert[lb] or _shared_edges(mesh, fa, fb) != 1:
+        return None
+    return la, lb
+
+
+def _dissolve_vert(mesh, v):
+    """Merge the two edges of a valence 2 vert into one. Returns False if that would break a face."""
+    vd, ed, ld, fd = mesh.vert_data, mesh.edge_data, mesh.loop_data, mesh.face_data
+    edges = list(mesh.disk(v))
+    if len(edges) != 2:
+        return False
+    e1, e2 = edges
+    a = ed.verts[e1, 1 - mesh._side(e1, v)]
+    b = ed.verts[e2, 1 - mesh._side(e2, v)]
+    if a == b or mesh.find_edge(a, b) >= 0:
+        return False
+    loops1, loops2 = list(mesh.radial(e1)), list(mesh.radial(e2))
+    faces = sorted(ld.face[l] for l in loops1)
+    if faces != sorted(ld.face[l] for l in loops2) or any(fd.len[f] <= 3 for f in faces):
+        return False
+
+    for l in loops1 + loops2:
+        if ld.vert[l] != v:
+            continue
+        f, p, n = ld.face[l], ld.prev[l], ld.next[l]
+        ld.next[p], ld.prev[n] = n, p
+        if fd.loop[f] == l:
+            fd.loop[f] = n
+        fd.len[f] -= 1
+        mesh._radial_remove(l)
+        mesh._kill(ld, l)
+    for l in loops2:
+        if ld.alive[l]:
+            mesh._radial_remove(l)
+            mesh._radial_insert(l, e1)
+
+    mesh._disk_remove(e1, v)
+    mesh._disk_remove(e2, v)
+    mesh._disk_remove(e2, b)
+    ed.verts[e1, mesh._side(e1, v)] = b
+    mesh._disk_insert(e1, b)
+    mesh._kill(ed, e2)
+    mesh._kill(vd, v)
+    return True
+
+
+def dissolve_edges(mesh: Mesh, edges, use_verts=False):
+    """Merge the two faces of each edge. Returns {'region': merged faces}.
+
+    Edges without exactly two faces, or whose faces can't be merged cleanly,
+    are left alone. With use_verts, verts left with two edges are dissolved too.
+    """
+    region = set()
+    touched = set()
+    for edge in edges:
+        if not edge.is_valid:
+            continue
+        loops = _joinable(mesh, edge.row)
+        if loops is None:
+            continue
+        touched.update(mesh.edge_data.verts[edge.row].tolist())
+        region.discard(mesh.loop_data.face[loops[1]])
+        region.add(_join(mesh, *loops))
+    if use_verts:
+        for v in touched:
+            if mesh.vert_data.alive[v]:
+                _dissolve_vert(mesh, v)
+    return {'region': [Face(mesh, f) for f in region if mesh.face_data.alive[f]]}
+
+
+def face_split(face: Face, vert_a: Vert, vert_b: Vert):
+    """Split `face` with a new edge between two of its non-adjacent verts.
+
+    Returns (new face, new loop) like bmesh.utils.face_split: the loop of the
+    new face that starts at vert_a and runs along the new edge. `face` keeps
+    the part starting at vert_a.
+    """
+    mesh = face.mesh
+    ld, fd = mesh.loop_data, mesh.face_data
+    f = face._check()
+    by_vert = {ld.vert[l]: l for l in mesh.face_loops(f)}
+    l1 = by_vert.get(vert_a._check())
+    l2 = by_vert.get(vert_b._check())
+    if l1 is None or l2 is None:
+        raise ValueError("face_split(...): verts are not part of the face")
+    if l1 == l2 or ld.next[l1] == l2 or ld.next[l2] == l1:
+        raise ValueError("face_split(...): verts are adjacent")
+
+    e = mesh.new_edge(vert_a.row, vert_b.row)
+    g = fd.add()
+    x = ld.add()  # Closes `face`, running from vert_b to vert_a.
+    y = ld.add()  # Closes the new face, running from vert_a to vert_b.
+    m, n = ld.prev[l2], ld.prev[l1]
+    ld.vert[x], ld.face[x], ld.prev[x], ld.next[x] = vert_b.row, f, m, l1
+    ld.vert[y], ld.face[y], ld.prev[y], ld.next[y] = vert_a.row, g, n, l2
+    ld.next[m] = ld.prev[l1] = x
+    ld.next[n] = ld.prev[l2] = y
+    mesh._radial_insert(x, e)
+    mesh._radial_insert(y, e)
+
+    fd.loop[f], fd.loop[g] = l1, l2
+    fd.select[g] = fd.select[f]
+    moved = list(mesh.face_loops(g))
+    for l in moved:
+        ld.face[l] = g
+    fd.len[g] = len(moved)
+    fd.len[f] += 2 - len(moved)
+    mesh._edited()
+    return Face(mesh, g), Loop(mesh, y)
+
+
+def face_join(faces):
+    """Merge connected `faces` into one across the edges they share. Returns the face, or None."""
+    faces = list(faces)
+    if not faces:
+        return None
+    mesh = faces[0].mesh
+    ld = mesh.loop_data
+    remaining = {f._check() for f in faces}
+    while len(remaining) > 1:
+        for f in remaining:
+            loops = next((loops for l in mesh.face_loops(f)
+                          for loops in [_joinable(mesh, ld.edge[l])]
+                          if loops is not None and ld.face[loops[0]] in remaining
+                          and ld.face[loops[1]] in remaining), None)
+            if loops is not None:
+                remaining.discard(ld.face[loops[1]])
+                remaining.discard(ld.face[loops[0]])
+                remaining.add(_join(mesh, *loops))
+                break
+        else:
+            return None
+    return Face(mesh, remaining.pop())
+
+
+ops = SimpleNamespace(dissolve_edges=dissolve_edges)
+utils = SimpleNamespace(face_split=face_split, face_join=face_join)
+
+
+def backend(mesh):
+    """Return the (ops, utils) namespaces that edit `mesh`: the kernel's for a Mesh, bmesh's otherwise."""
+    if isinstance(mesh, Mesh):
+        return ops, utils
+    import bmesh
+    return bmesh.ops, bmesh.utils
@@ -0,0 +1,275 @@
+"""
+Edge walking algorithms, shared by the AdvEdgeSelect and ZigZagSelect
+operators.
+
+ordered_edge_list works on BMesh and MeshKernel elements alike, the rest on
+Topology arrays.
+"""
+import numpy as np
+
+import MeshKernel
+import Topology
+
+
+def ordered_edge_list(center: MeshKernel.Vert, start: MeshKernel.Edge):
+    out = [start]
+    cur = start
+    faces = list(center.link_faces)
+    while len(faces):
+        for f in faces:
+            if cur in f.edges:
+                other_edge = None
+                for e in f.edges:
+                    if e == cur:
+                        continue
+                    if center in e.verts:
+                        other_edge = e
+                        break
+                if other_edge is None:
+                    return faces
+                cur = other_edge
+                out.append(cur)
+                faces.remove(f)
+                break
+        else:
+            # Open fan: no face left continues from `cur`.
+            break
+    return out
+
+
+def next_edge_table(topo: Topology.MeshTopology, action3, action4, action5, actionEven, actionOdd):
+    """Compile the junction rules into an edge -> next edges adjacency.
+
+    Each edge gets the edges its selection continues into at both of its
+    verts. Rules that need the radial order (opposite, every other) only
+    apply at verts with a closed fan. The table is cached on the topology
+    per rule combination.
+    """
+    key = ('next_edge_table', action3, action4, action5, actionEven, actionOdd)
+    table = topo.cache.get(key)
+    if table is not None:
+        return table
+
+    vert_edges = topo.vert_edges
+    n = vert_edges.degree()
+    row, edges = vert_edges.pairs()
+    valence = n[row]
+
+    # Continue down every other edge of the vert.
+    to_all = ((valence == 2)
+              | ((valence == 3) & (action3 == "1"))
+              | ((valence == 5) & (action5 == "1"))
+              | ((valence >= 7) & (valence % 2 == 1) & (actionOdd == "1")))
+    i, others = Topology.expand(vert_edges, row[to_all])
+    src = [edges[to_all][i]]
+    dst = [others]
+
+    # Continue down edges at fixed radial offsets.
+    closed = topo.fan_closed[row]
+    opposite = closed & (((valence == 4) & (action4 == "1"))
+                         | ((valence >= 6) & (valence % 2 == 0) & (actionEven == "1")))
+    every_other = closed & (valence >= 6) & (valence % 2 == 0) & (actionEven == "2")
+    side = (topo.edge_verts[edges, 0] != row).astype(np.int64)
+    pos = topo.fan_pos[edges, side]
+    fan = topo.vert_fan
+    for mask, offsets in ((opposite, valence // 2), (every_other, None)):
+        if offsets is None:
+            # Offsets 2, 4, .., n - 2 for each incidence.
+            count = np.where(mask, valence // 2 - 1, 0)
+            incidence = np.repeat(np.arange(len(edges)), count)
+            offsets = 2 * (np.arange(len(incidence)) - np.repeat(np.cumsum(count) - count, count) + 1)
+        else:
+            incidence = np.flatnonzero(mask)
+            offsets = offsets[incidence]
+        v = row[incidence]
+        src.append(edges[incidence])
+        dst.append(fan.indices[fan.indptr[v] + (pos[incidence] + offsets) % valence[incidence]])
+
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+    keep = src != dst
+    table = Topology.unique_pairs(src[keep], dst[keep], topo.num_edges)
+    topo.cache[key] = table
+    return table
+
+
+def propagate_edges(table: Topology.Adjacency, selected, blocked):
+    """Grow the `selected` edge mask along `table`, never entering `blocked` edges.
+
+    Only the edges added in the previous round are expanded. Returns the
+    number of rounds.
+    """
+    frontier = np.flatnonzero(selected & ~blocked)
+    rounds = 0
+    while len(frontier):
+        rounds += 1
+        _, reached = Topology.expand(table, frontier)
+        frontier = np.unique(reached[~selected[reached] & ~blocked[reached]])
+        selected[frontier] = True
+    return rounds
+
+
+def opposite_edge_table(topo: Topology.MeshTopology):
+    """Per loop of a triangle, the edge opposite the loop's vert. -1 for loops of other faces."""
+    table = topo.cache.get('opposite_edge_table')
+    if table is None:
+        tris = topo.loop_total[topo.loop_faces] == 3
+        table = np.where(tris, topo.loop_edges[topo.loop_next], -1)
+        topo.cache['opposite_edge_table'] = table
+    return table
+
+
+def other_vert(topo: Topology.MeshTopology, edges, verts):
+    edge_verts = topo.edge_verts[edges]
+    return np.where(edge_verts[:, 0] == verts, edge_verts[:, 1], edge_verts[:, 0])
+
+
+def zigzag_seeds(topo: Topology.MeshTopology, selected):
+    """Triangles with exactly two selected edges, as (face, edge_a, edge_b, shared vert) arrays."""
+    tris = np.flatnonzero(topo.loop_total == 3)
+    loops = topo.loop_start[tris][:, None] + np.arange(3)
+    edges = topo.loop_edges[loops]
+    two = selected[edges].sum(axis=1) == 2
+    tris, loops, edges = tris[two], loops[two], edges[two]
+
+    # Loop k runs along edge (v[k], v[k + 1]), so the unselected edge j is
+    # opposite v[j + 2], the vert both selected edges share.
+    rows = np.arange(len(tris))
+    j = np.argmin(selected[edges], axis=1)
+    shared = topo.loop_verts[loops[rows, (j + 2) % 3]]
+    return tris, edges[rows, (j + 1) % 3], edges[rows, (j + 2) % 3], shared
+
+
+def cross_edges(topo: Topology.MeshTopology, face, edge, pivot):
+    """Step zigzags across `edge` out of `face`.
+
+    Returns (ok, faces, next_edges): whether the face on the other side is a
+    triangle across a manifold edge, that triangle, and its edge opposite
+    `pivot`, the next edge of the zigzag. next_edges is -1 where not ok.
+    """
+    table = opposite_edge_table(topo)
+    edge_faces = topo.edge_faces
+    manifold = edge_faces.degree() == 2
+    last = max(len(edge_faces.indices) - 1, 0)
+    first = edge_faces.indices[np.minimum(edge_faces.indptr[:-1], last)]
+    second = edge_faces.indices[np.minimum(edge_faces.indptr[:-1] + 1, last)]
+
+    faces = np.where(first[edge] == face, second[edge], first[edge])
+    ok = manifold[edge] & (topo.loop_total[faces] == 3)
+    start = topo.loop_start[faces[ok]]
+    corner = np.argmax(topo.loop_verts[start[:, None] + np.arange(3)] == pivot[ok][:, None], axis=1)
+    next_edges = np.full(len(face), -1, dtype=np.int64)
+    next_edges[ok] = table[start + corner]
+    return ok, faces, next_edges
+
+
+def walk_zigzags(topo: Topology.MeshTopology, face, edge, pivot, visited):
+    """Walk many zigzags in lockstep.
+
+    A walk crosses `edge` out of `face` and continues along the edge of the
+    next triangle opposite `pivot`. It stops at non-triangles, boundaries and
+    edges already in `visited`, which is updated in place, so closed loops end
+    where they started. Returns (walk, vert, edge, face) arrays with one row
+    per step, vert being the new far vert of the zigzag.
+    """
+    walk = np.arange(len(face))
+    steps = []
+    while len(walk):
+        ok, faces, next_edge = cross_edges(topo, face, edge, pivot)
+        walk, face, edge, pivot, next_edge = walk[ok], faces[ok], edge[ok], pivot[ok], next_edge[ok]
+
+        # Stop on visited edges, and let only one walk claim an edge per step.
+        fresh = ~visited[next_edge]
+        _, claim = np.unique(next_edge, return_index=True)
+        claimed = np.zeros(len(walk), dtype=bool)
+        claimed[claim] = True
+        go = fresh & claimed
+        # Faces are selected up to and including the one a walk stops in.
+        steps.append((walk[~go], np.full(np.count_nonzero(~go), -1), np.full(np.count_nonzero(~go), -1),
+                      face[~go]))
+
+        walk, face, edge, pivot, next_edge = walk[go], face[go], edge[go], pivot[go], next_edge[go]
+        visited[next_edge] = True
+        pivot = other_vert(topo, edge, pivot)
+        steps.append((walk, other_vert(topo, next_edge, pivot), next_edge, face))
+        edge = next_edge
+
+    if not steps:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    return tuple(np.concatenate(column) for column in zip(*steps))
+
+
+def zigzag_strips(topo: Topology.MeshTopology, selected):
+    """Extend the selected zigzags as far as they go.
+
+    Seeds are the triangles with two selected edges. Seeds whose zigzag
+    continues into the next seed belong to the same zigzag, so a zigzag
+    selected by an earlier run is one strip and is only walked from its free
+    ends. Returns (strips, edges, faces): the vert index array of each
+    zigzag, and the edges and faces to select.
+    """
+    face, edge_a, edge_b, shared = zigzag_seeds(topo, selected)
+    n = len(face)
+    if not n:
+        return [], face, face
+    # Side k < n of seed k crosses edge_b, side n + k crosses edge_a.
+    faces = np.concatenate([face, face])
+    edges = np.concatenate([edge_b, edge_a])
+    pivots = np.concatenate([shared, shared])
+    ends = other_vert(topo, edges, pivots)
+    ok, across, next_edges = cross_edges(topo, faces, edges, pivots)
+    continues = ok & selected[next_edges]
+
+    seed_of_face = np.full(topo.num_faces, -1, dtype=np.int64)
+    seed_of_face[face] = np.arange(n)
+    neighbor = np.full(2 * n, -1, dtype=np.int64)
+    neighbor[continues] = seed_of_face[across[continues]]
+    linked = np.flatnonzero(neighbor >= 0)
+    labels = Topology.connected_labels(n, linked % n, neighbor[linked])
+
+    # Enter every zigzag by an unlinked side, or by side a of its first seed when it is closed.
+    roots, first = np.unique(labels, return_index=True)
+    entry = n + first
+    unlinked = np.flatnonzero(neighbor < 0)
+    open_roots, pick = np.unique(labels[unlinked % n], return_index=True)
+    entry[np.searchsorted(roots, open_roots)] = unlinked[pick]
+
+    # Follow the linked seeds, each adding the far vert of the side it leaves by.
+    zigzag = np.arange(len(roots))
+    exit_side = (entry + n) % (2 * n)
+    seen = np.zeros(n, dtype=bool)
+    seen[entry % n] = True
+    last = exit_side.copy()
+    steps = [(zigzag, ends[entry]), (zigzag, shared[entry % n]), (zigzag, ends[exit_side])]
+    while len(zigzag):
+        seed = neighbor[exit_side]
+        go = seed >= 0
+        go[go] = ~seen[seed[go]]
+        zigzag, exit_side, seed = zigzag[go], exit_side[go], seed[go]
+        seen[seed] = True
+        exit_side = np.where(edges[seed] != edges[exit_side], seed, n + seed)
+        last[zigzag] = exit_side
+        steps.append((zigzag, ends[exit_side]))
+    zigzag, verts = (np.concatenate(column) for column in zip(*steps))
+    lengths = np.bincount(zigzag, minlength=len(roots))
+    chains = np.split(verts[np.argsort(zigzag, kind='stable')], np.cumsum(lengths)[:-1])
+
+    free = np.flatnonzero(~continues)
+    walk, walked_verts, walked_edges, walked_faces = walk_zigzags(topo, faces[free], edges[free], pivots[free],
+                                                                 selected.copy())
+    has_vert = walked_verts >= 0
+    side = free[walk[has_vert]]
+    grouped = walked_verts[has_vert][np.argsort(side, kind='stable')]
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(side, minlength=2 * n))])
+    # The last seed of a closed zigzag leaves by the edge the first one was entered by.
+    closed = neighbor[last] == entry % n
+    strips = []
+    for i, chain in enumerate(chains):
+        if closed[i]:
+            chain = chain[:-1]
+        backward = grouped[bounds[entry[i]]:bounds[entry[i] + 1]]
+        forward = grouped[bounds[last[i]]:bounds[last[i] + 1]]
+        strips.append(np.concatenate([backward[::-1], chain, forward]))
+
+    return strips, walked_edges[walked_edges >= 0], np.concatenate([face, walked_faces])
@@ -0,0 +1,571 @@
+"""
+Quad fixing algorithms, shared by the FixQuads, FixQuadStrip and
+SelectLinkedQuads operators.
+
+The element based code (FaceExplorer, EdgeWalker) works on BMesh elements
+and on MeshKernel elements alike, editing through MeshKernel.backend().
+The rest works on Topology arrays.
+"""
+import heapq
+import itertools
+from collections import defaultdict, deque
+
+from typing import Dict, List, Set, Optional
+
+import numpy as np
+
+import Instrumentation
+import MeshKernel
+import Topology
+
+
+def get_opposite_face(face, edge):
+    faces = set(edge.link_faces)
+    assert face in faces
+    faces.remove(face)
+    if len(faces) == 0:
+        return None
+    if len(faces) > 1:
+        rec = Instrumentation.current()
+        if rec:
+            rec.trace(Instrumentation.WARNING, "Edge %d has more than 2 faces", edge.index)
+        return None
+    return faces.pop()
+
+
+def get_neighbors(face):
+    neighbors = set()
+    for edge in face.edges:
+        f = get_opposite_face(face, edge)
+        if f is not None:
+            neighbors.add(f)
+    return neighbors
+
+
+def pop_triangle(face_set: Set[MeshKernel.Face]) -> Optional[MeshKernel.Face]:
+    for face in face_set:
+        if len(face.edges) == 3:
+            face_set.remove(face)
+            return face
+    return None
+
+
+def pop_quad(face_set: Set[MeshKernel.Face]) -> Optional[MeshKernel.Face]:
+    for face in face_set:
+        if len(face.edges) == 4:
+            face_set.remove(face)
+            return face
+    return None
+
+
+class FaceExplorer(object):
+    def __init__(self, bm: MeshKernel.Mesh, correct_faces: Set[MeshKernel.Face], batch=False):
+        self.bm = bm
+        self.ops, self.utils = MeshKernel.backend(bm)
+        self.correct_faces = set()  # type:Set[MeshKernel.Face]
+        self.correct_edges = set()  # type:Set[MeshKernel.Edge]
+
+        # Heap of (-correct neighbors, push order, face). A face is queued at most
+        # once; re-pushing it with a higher priority leaves a stale entry behind
+        # that pop() skips.
+        self.to_explore = []
+        self.queued = {}  # type:Dict[MeshKernel.Face, int]
+        self.order = itertools.count()
+        self.stats = defaultdict(int)
+        # The instrumentation session, fetched once per explore() for the traces.
+        self.rec = None
+
+        # In batch mode dissolves are collected per round and run together by
+        # commit(). Triangles near a pending dissolve wait for the next round.
+        self.batch = batch
+        self.pending = []  # type:List[MeshKernel.Edge]
+        self.locked = set()  # type:Set[MeshKernel.Face]
+        self.deferred = []  # type:List[MeshKernel.Face]
+
+        for face in correct_faces:
+            self.mark_correct(face)
+        self.dirty = False
+
+    def push(self, face):
+        self.stats['pushed'] += 1
+        priority = len(self.get_correct_faces(get_neighbors(face)))
+        if self.queued.get(face, -1) >= priority:
+            self.stats['deduplicated'] += 1
+            return
+        self.queued[face] = priority
+        heapq.heappush(self.to_explore, (-priority, next(self.order), face))
+        self.stats['high_water'] = max(self.stats['high_water'], len(self.queued))
+
+    def pop(self) -> Optional[MeshKernel.Face]:
+        """Return the queued face with the most correct neighbors, or None when done."""
+        while self.to_explore:
+            priority, _, face = heapq.heappop(self.to_explore)
+            if self.queued.get(face) != -priority:
+                continue
+            del self.queued[face]
+            self.stats['popped'] += 1
+            return face
+        return None
+
+    def mark_correct(self, face):
+        if face in self.correct_faces:
+            return False
+
+        self.dirty = True
+        self.correct_faces.add(face)
+        self.correct_edges.update(face.edges)
+        for f in get_neighbors(face).difference(self.correct_faces):
+            self.push(f)
+        return True
+
+    def get_correct_faces(self, other: set):
+        return self.correct_faces.intersection(other)
+
+    def is_correct_edge(self, edge):
+        return bool(self.get_correct_faces(set(edge.link_faces)))
+
+    def get_correct_edges(self, other: set):
+        return self.correct_edges.intersection(other)
+
+    def dissolve_edge(self, edge):
+        edge.select = True
+        if not self.batch:
+            self.dissolve_edges([edge])
+            return True
+
+        self.pending.append(edge)
+        for face in edge.link_faces:
+            self.locked.add(face)
+            self.locked.update(get_neighbors(face))
+        return True
+
+    def dissolve_edges(self, edges):
+        """Dissolve edges right away and re-queue the faces around them."""
+        res = self.ops.dissolve_edges(self.bm, edges=edges)
+        self.stats['dissolved'] += len(edges)
+        self.changed(res['region'])
+
+    def blocked(self, face):
+        """True when `face` or a neighbor is part of a pending dissolve's neighborhood."""
+        return bool(self.locked) and (face in self.locked or not self.locked.isdisjoint(get_neighbors(face)))
+
+    def defer(self, face):
+        self.stats['deferred'] += 1
+        self.deferred.append(face)
+
+    def commit(self):
+        """Run the pending dissolves in one call. Returns False if there was nothing to do."""
+        if not self.pending:
+            return False
+        edges = [e for e in self.pending if e.is_valid]
+        deferred = self.deferred
+        self.pending = []
+        self.locked = set()
+        self.deferred = []
+
+        self.stats['batches'] += 1
+        self.dissolve_edges(edges)
+        for face in deferred:
+            if face.is_valid:
+                self.push(face)
+        return True
+
+    def changed(self, faces):
+        """Re-queue faces touched by a topology edit, and their neighbors."""
+        self.dirty = True
+        for face in faces:
+            if not face.is_valid:
+                continue
+            if face not in self.correct_faces:
+                self.push(face)
+            for f in get_neighbors(face).difference(self.correct_faces):
+                self.push(f)
+
+
+def handle_quad(exp: FaceExplorer, quad):
+    valid_n = exp.get_correct_faces(get_neighbors(quad))
+
+    if len(valid_n) < 2:
+        # We don't know yet.
+        return False
+    elif len(valid_n) == 2:
+        # A quad that's between 2 correct faces is only guaranteed correct if those two faces touch.
+        a = set(valid_n.pop().verts)
+        b = set(valid_n.pop().verts)
+        if len(a.intersection(b)) == 0:
+            return False
+    # 3 or 4 valid neighbors means we're valid
+    exp.mark_correct(quad)
+    return True
+
+
+def handle_triangle(explorer: FaceExplorer, tri):
+    all_correct = True
+    for e in tri.edges:
+        if not explorer.is_correct_edge(e):
+            all_correct = False
+            if dissolvable_edge(explorer, e):
+                return True
+            if rotate_edge(explorer, e):
+                return True
+    if all_correct:
+        if explorer.rec:
+            explorer.rec.trace(Instrumentation.DEBUG, "All sides of triangle %d are correct", tri.index)
+        explorer.mark_correct(tri)
+    return False
+
+
+def explore(fe: FaceExplorer):
+    """Explore queued faces until nothing is left to fix. Returns True if anything changed."""
+    fe.dirty = False
+    fe.rec = Instrumentation.current()
+    while True:
+        face = fe.pop()
+        if face is None:
+            # End of a round: run the collected dissolves, then explore around them.
+            if fe.commit():
+                continue
+            break
+        if not face.is_valid:
+            continue
+        if len(face.edges) > 4:
+            fe.stats['ngons'] += 1
+            continue
+        if len(face.edges) == 4:
+            if face in fe.correct_faces:
+                continue
+            fe.stats['quads'] += 1
+            handle_quad(fe, face)
+        if len(face.edges) == 3:
+            if fe.blocked(face):
+                fe.defer(face)
+                continue
+            fe.stats['triangles'] += 1
+            handle_triangle(fe, face)
+    return fe.dirty
+
+
+def dissolvable_edge(exp: FaceExplorer, edge):
+    faces = set(edge.link_faces)
+    t1 = pop_triangle(faces)
+    t2 = pop_triangle(faces)
+    if len(faces) != 0 or t1 is None or t2 is None:
+        return False
+    c1 = exp.get_correct_edges(set(t1.edges))
+    c2 = exp.get_correct_edges(set(t2.edges))
+    if len(c1) == 2 or len(c2) == 2:
+        return exp.dissolve_edge(edge)
+
+    # Check for 2 adjacent edges that are both good.
+    for e1 in c1:
+        if e1 == edge:
+            continue
+        for e2 in c2:
+            if e2 == edge:
+                continue
+            if len(common_verts(e1, e2)) != 1:
+                continue
+            if len(common_verts(get_opposite_face(t1, e1), get_opposite_face(t2, e2))) != 1:
+                continue
+            return exp.dissolve_edge(edge)
+    return False
+
+
+def rotate_edge(exp: FaceExplorer, middle_edge: MeshKernel.Edge):
+    exp.stats['rotate_attempts'] += 1
+    rec = exp.rec
+    if exp.get_correct_edges({middle_edge}):
+        if rec:
+            rec.trace(Instrumentation.DEBUG, "Edge %d already correct", middle_edge.index)
+        return False
+
+    faces = set(middle_edge.link_faces)
+    t = pop_triangle(faces)
+    q = pop_quad(faces)
+    if len(faces) != 0 or t is None or q is None:
+        if rec:
+            rec.trace(Instrumentation.DEBUG, "Edge %d not between triangle and quad", middle_edge.index)
+        return False
+
+    tc = exp.get_correct_edges(set(t.edges))
+    qc = exp.get_correct_edges(set(q.edges))
+    if not tc:
+        return False
+    tc0 = list(tc)[0]
+    tn = list(get_neighbors(t) - {q})
+
+    def check_edge(cut_edge):
+        edge = find_quad_edge_completing_triangle(q, cut_edge, middle_edge.verts)
+        if not edge:
+            return False
+
+        opp = get_opposite_face(q, edge)
+        if opp:
+            # opp should share 0 verts with one of the triangles neighbors
+            # and 1 with the other neighrbor
+            c = set(len(common_verts(opp, n)) for n in tn)
+            if c != {0, 1}:
+                return False
+
+        valid = False
+        if len(tc) == 2:
+            # triangle provides 2 touching correct faces.
+            pass
+        elif common_verts(tc0, edge) and (edge in qc):
+            # Triangle's correct edge is touching the newly added edge
+            # and the newly added edge is correct, then we have 2 correct edges
+            pass
+        else:
+            return False
+
+        # Split the quad along the cut, then merge the triangle into the half next to it.
+        exp.utils.face_split(q, cut_edge[0], cut_edge[1])
+        exp.dissolve_edges([middle_edge])
+        exp.stats['rotated'] += 1
+        for f in tc0.link_faces:
+            exp.mark_correct(f)
+        return True
+
+    v = list(q.verts)
+    return check_edge(v[0::2]) or check_edge(v[1::2])
+
+
+def common_verts(f1, f2):
+    return set(f1.verts).intersection(f2.verts)
+
+
+def find_quad_edge_completing_triangle(quad, v1, v2):
+    search_verts = set(v1).symmetric_difference(set(v2))
+    for e in quad.edges:
+        if set(e.verts) == search_verts:
+            return e
+    return None
+
+
+def triangle_pairs(topo: Topology.MeshTopology):
+    """Edges shared by exactly two triangles, as (edges, loop1, loop2) arrays.
+
+    loop1 and loop2 are the loops of the two triangles that run along the edge.
+    """
+    edge_loops = topo.edge_loops
+    edges = np.flatnonzero(edge_loops.degree() == 2)
+    l1 = edge_loops.indices[edge_loops.indptr[edges]]
+    l2 = edge_loops.indices[edge_loops.indptr[edges] + 1]
+    tris = topo.loop_total == 3
+    f1 = topo.loop_faces[l1]
+    f2 = topo.loop_faces[l2]
+    keep = tris[f1] & tris[f2] & (f1 != f2)
+    return edges[keep], l1[keep], l2[keep]
+
+
+def pair_scores(topo: Topology.MeshTopology, co, correct, edges, l1, l2):
+    """Score the quad that dissolving each edge would make, 0 for non-convex ones.
+
+    Combines how square the corners are, how planar the two triangles are and
+    how many outer edges the quad shares with `correct` faces.
+    """
+    a = co[topo.edge_verts[edges, 0]]
+    b = co[topo.edge_verts[edges, 1]]
+    c1 = co[topo.loop_verts[topo.loop_prev[l1]]]
+    c2 = co[topo.loop_verts[topo.loop_prev[l2]]]
+
+    def unit(v):
+        return v / np.maximum(np.linalg.norm(v, axis=-1, keepdims=True), 1e-12)
+
+    n1 = np.cross(b - a, c1 - a)
+    n2 = np.cross(a - b, c2 - b)
+    planarity = (1 + np.einsum('ij,ij->i', unit(n1), unit(n2))) / 2
+
+    # The quad is convex when the new diagonal separates the old edge's verts.
+    n = n1 + n2
+    side_a = np.einsum('ij,ij->i', np.cross(c2 - c1, a - c1), n)
+    side_b = np.einsum('ij,ij->i', np.cross(c2 - c1, b - c1), n)
+    convex = side_a * side_b < 0
+
+    corners = [a, c1, b, c2]
+    worst = np.zeros(len(edges))
+    for i in range(4):
+        u = corners[i - 1] - corners[i]
+        v = corners[(i + 1) % 4] - corners[i]
+        angle = np.arctan2(np.linalg.norm(np.cross(u, v), axis=-1), np.einsum('ij,ij->i', u, v))
+        worst = np.maximum(worst, np.abs(angle - np.pi / 2))
+    squareness = np.clip(1 - worst / (np.pi / 2), 0, 1)
+
+    correct_edge = np.zeros(topo.num_edges, dtype=bool)
+    correct_edge[topo.loop_edges[correct[topo.loop_faces]]] = True
+    outer = [topo.loop_edges[topo.loop_next[l1]], topo.loop_edges[topo.loop_prev[l1]],
+             topo.loop_edges[topo.loop_next[l2]], topo.loop_edges[topo.loop_prev[l2]]]
+    agreement = sum(correct_edge[e] for e in outer) / 4
+
+    return np.where(convex, squareness * planarity * (1 + agreement), 0)
+
+
+class EdgeWalker:
+    """Walks the shared edges of the triangle strips in a selection.
+
+    Edges and faces get dense ids as they are added. Each face has two edge
+    slots and each edge two face slots in flat lists (-1 when empty), so the
+    next edge of a strip is a couple of list lookups.
+    """
+
+    def __init__(self):
+        self.edges = []  # type:List[MeshKernel.Edge]
+        self.edge_ids = {}  # type:Dict[MeshKernel.Edge, int]
+        self.face_ids = {}  # type:Dict[MeshKernel.Face, int]
+        self.edge_faces = []
+        self.face_edges = []
+
+        # Walk state used by step().
+        self.prev = -1
+        self.cur = -1
+
+    def add_edge(self, face: MeshKernel.Face, edge: MeshKernel.Edge):
+        e = self.edge_ids.get(edge)
+        if e is None:
+            e = self.edge_ids[edge] = len(self.edges)
+            self.edges.append(edge)
+            self.edge_faces.extend((-1, -1))
+        f = self.face_ids.get(face)
+        if f is None:
+            f = self.face_ids[face] = len(self.face_ids)
+            self.face_edges.extend((-1, -1))
+
+        assert -1 in self.edge_faces[2 * e:2 * e + 2]
+        assert -1 in self.face_edges[2 * f:2 * f + 2]
+        self.edge_faces[2 * e + self.edge_faces[2 * e:2 * e + 2].index(-1)] = f
+        self.face_edges[2 * f + self.face_edges[2 * f:2 * f + 2].index(-1)] = e
+
+    def neighbors(self, e):
+        """Ids of the edges sharing a face with edge id `e`."""
+        res = []
+        for f in self.edge_faces[2 * e:2 * e + 2]:
+            if f == -1:
+                continue
+            for o in self.face_edges[2 * f:2 * f + 2]:
+                if o != -1 and o != e:
+                    res.append(o)
+        return res
+
+    def step(self):
+        """Move to the next edge of the strip, away from the previous one. cur is -1 at the end."""
+        nxt = -1
+        for o in self.neighbors(self.cur):
+            if o != self.prev:
+                nxt = o
+                break
+        self.prev, self.cur = self.cur, nxt
+
+    def strips(self):
+        """Split the added edges into strips, as lists of edge ids in walking order.
+
+        Open strips are walked from an end, closed loops from their first added edge.
+        """
+        visited = [False] * len(self.edges)
+
+        def walk(start):
+            strip = []
+            self.prev, self.cur = -1, start
+            while self.cur != -1 and not visited[self.cur]:
+                visited[self.cur] = True
+                strip.append(self.cur)
+                self.step()
+            return strip
+
+        res = []
+        for e in range(len(self.edges)):
+            if not visited[e] and len(self.neighbors(e)) < 2:
+                res.append(walk(e))
+        for e in range(len(self.edges)):
+            if not visited[e]:
+                res.append(walk(e))
+        return res
+
+    def walk_edges(self, skip_first):
+        """Yield every other edge of every strip, starting from the second one if skip_first."""
+        for strip in self.strips():
+            for e in strip[1 if skip_first else 0::2]:
+                yield self.edges[e]
+
+
+def strip_walker(faces):
+    """An EdgeWalker over the edges shared by two faces of `faces`."""
+    faces = set(faces)
+    ew = EdgeWalker()
+    for face in faces:
+        for edge in face.edges:
+            linked = edge.link_faces
+            if len(linked) == 2 and all(n in faces for n in linked):
+                ew.add_edge(face, edge)
+    return ew
+
+
+def quad_labels(topo: Topology.MeshTopology):
+    """Return (labels, a, b) for the mesh, where labels marks quad components and -1 non-quads.
+
+    (a, b) are the face pairs sharing an edge. The result is cached on the topology.
+    """
+    cached = topo.cache.get('quad_labels')
+    if cached is not None:
+        return cached
+
+    a, b = topo.face_faces.pairs()
+    quads = topo.loop_total == 4
+    both = quads[a] & quads[b]
+    labels = Topology.connected_labels(topo.num_faces, a[both], b[both])
+    labels[~quads] = -1
+
+    topo.cache['quad_labels'] = labels, a, b
+    return labels, a, b
+
+
+def linked_quad_faces(labels, a, b, selected):
+    """Return a mask of the faces reached from `selected` by walking across quads."""
+    quads = labels >= 0
+    # Any selected face floods into neighboring quads, quads flood through each other.
+    seeds = np.concatenate([
+        labels[selected & quads],
+        labels[b[selected[a] & quads[b]]],
+        labels[a[selected[b] & quads[a]]],
+    ])
+    reached = np.zeros(len(labels), dtype=bool)
+    reached[np.unique(seeds)] = True
+    return selected | (quads & reached[np.maximum(labels, 0)])
+
+
+def strip_links(topo: Topology.MeshTopology, selected):
+    """Map each selected face to its (edge, neighbor) links with other selected faces."""
+    loops = np.flatnonzero(selected[topo.loop_faces])
+    i, neighbors = Topology.expand(topo.edge_faces, topo.loop_edges[loops])
+    faces = topo.loop_faces[loops[i]]
+    keep = (neighbors != faces) & selected[neighbors]
+
+    links = {f: [] for f in np.flatnonzero(selected).tolist()}
+    for face, edge, neighbor in zip(faces[keep].tolist(), topo.loop_edges[loops[i]][keep].tolist(),
+                                    neighbors[keep].tolist()):
+        links[face].append((edge, neighbor))
+    return links
+
+
+def pair_strip(links):
+    """Pair up strip faces from the ends inwards.
+
+    Returns the edges between paired faces and the set of faces left unpaired.
+    """
+    degree = {face: len(l) for face, l in links.items()}
+    alive = set(links)
+    ends = deque(face for face, d in degree.items() if d == 1)
+    edges = []
+    while ends:
+        face = ends.popleft()
+        if face not in alive or degree[face] != 1:
+            continue
+        edge, other = next((e, n) for e, n in links[face] if n in alive)
+        edges.append(edge)
+        alive.discard(face)
+        alive.discard(other)
+        for _, n in links[other]:
+            if n in alive:
+                degree[n] -= 1
+                if degree[n] == 1:
+                    ends.append(n)
+    return edges, {face: degree[face] for face in alive}
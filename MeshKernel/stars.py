@@ -0,0 +1,204 @@
+"""
+Star point detection, shared by the StarPoints operators.
+
+A star point is a vert whose second ring has twice as many verts as its
+first. Everything works on Topology arrays; fix_stars() edits a BMesh or a
+MeshKernel.Mesh through MeshKernel.backend().
+"""
+from collections import defaultdict
+
+from typing import Set
+
+import numpy as np
+
+import MeshKernel
+import Topology
+
+
+def is_star_point(topo: Topology.MeshTopology, vert: int):
+    vert_verts = topo.vert_verts
+    n1 = set(vert_verts[vert].tolist())
+    n2 = set()
+    for n in n1:
+        n2.update(vert_verts[n].tolist())
+    n2.difference_update(n1)
+    n2.remove(vert)
+    return len(n2) == 2 * len(n1)
+
+def star_point_mask(topo: Topology.MeshTopology, valence=0, chunk=65536):
+    """is_star_point for every vert at once, optionally restricted to one valence."""
+    vert_verts = topo.vert_verts
+    n = topo.num_verts
+    ring1 = vert_verts.degree()
+    ring2 = np.zeros(n, dtype=np.int64)
+    for start in range(0, n, chunk):
+        verts = np.arange(start, min(start + chunk, n))
+        i1, n1 = Topology.expand(vert_verts, verts)
+        i2, n2 = Topology.expand(vert_verts, n1)
+        owner = i1[i2]
+        key = np.unique(owner * n + n2)
+        owner, n2 = key // n, key % n
+        inner = Topology.contains(np.sort(i1 * n + n1), key) | (n2 == verts[owner])
+        ring2[start:start + len(verts)] = np.bincount(owner[~inner], minlength=len(verts))
+
+    mask = (ring1 > 0) & (ring2 == 2 * ring1)
+    if valence:
+        mask &= ring1 == valence
+    return mask
+
+
+def neighbor_star_points(topo: Topology.MeshTopology, vert: int):
+    """Return the verts 4 rings out from `vert` that are reached by 6 shortest paths."""
+    vert_verts = topo.vert_verts
+    count = defaultdict(int)
+    count[vert] = 1
+    seen = {vert}
+    ring = {vert}
+    for _ in range(4):
+        next_ring = set()
+        for v in ring:
+            for n in vert_verts[v].tolist():
+                if n in seen:
+                    continue
+                count[n] += count[v]
+                next_ring.add(n)
+        seen.update(next_ring)
+        ring = next_ring
+
+    return [n for n in ring if count[n] == 6]
+
+
+def neighbor_star_points_batch(topo: Topology.MeshTopology, verts):
+    """neighbor_star_points for many verts at once.
+
+    Returns (owner, star) arrays: star[i] is a star point of verts[owner[i]].
+    """
+    owner, star, count = Topology.ring_path_counts(topo.vert_verts, verts, 4)
+    found = count == 6
+    return owner[found], star[found]
+
+
+def small_star_table(topo: Topology.MeshTopology):
+    """Per loop, the neighbor_star_points_small result it contributes, or -1.
+
+    For a corner of a triangle that is the apex of the triangle across the
+    edge opposite the corner.
+    """
+    table = topo.cache.get('small_star_table')
+    if table is not None:
+        return table
+
+    tris = topo.loop_total[topo.loop_faces] == 3
+    opposite = topo.loop_edges[topo.loop_next]
+    edge_loops = topo.edge_loops
+    manifold = edge_loops.degree()[opposite] == 2
+    first = edge_loops.indices[np.minimum(edge_loops.indptr[opposite], topo.num_loops - 1)]
+    second = edge_loops.indices[np.minimum(edge_loops.indptr[opposite] + 1, topo.num_loops - 1)]
+    across = np.where(topo.loop_faces[first] == topo.loop_faces, second, first)
+
+    valid = tris & manifold & tris[across]
+    table = np.where(valid, topo.loop_verts[topo.loop_prev[across]], -1)
+    topo.cache['small_star_table'] = table
+    return table
+
+
+def neighbor_star_points_small_batch(topo: Topology.MeshTopology, verts):
+    """neighbor_star_points_small for many verts at once, as (owner, star) arrays."""
+    owner, loops = Topology.expand(topo.vert_loops, verts)
+    star = small_star_table(topo)[loops]
+    found = star >= 0
+    return owner[found], star[found]
+
+
+def propagate_star_points(selected, neighbors):
+    """Grow the `selected` vert mask to its star lattice, expanding only new stars.
+
+    Returns (rounds, processed) for reporting.
+    """
+    frontier = np.flatnonzero(selected)
+    rounds = 0
+    processed = 0
+    while len(frontier):
+        rounds += 1
+        processed += len(frontier)
+        _, found = neighbors(frontier)
+        frontier = np.unique(found[~selected[found]])
+        selected[frontier] = True
+    return rounds, processed
+
+
+def select_contained_edges(topo: Topology.MeshTopology, verts: Set[int]):
+    res = set()
+    edge_verts = topo.edge_verts
+    for v in verts:
+        for e in topo.vert_edges[v].tolist():
+            a, b = edge_verts[e]
+            if a in verts and b in verts:
+                res.add(e)
+    return res
+
+
+def select_star_edges(topo: Topology.MeshTopology, center: int, outer=True):
+    vert_verts = topo.vert_verts
+    inner_verts = set(vert_verts[center].tolist())
+    edges = select_contained_edges(topo, inner_verts)
+
+    if outer:
+        outer_verts = set()
+        for v in inner_verts:
+            outer_verts.update(vert_verts[v].tolist())
+        outer_verts -= inner_verts
+        outer_verts.remove(center)
+        edges |= select_contained_edges(topo, outer_verts)
+
+    return edges
+
+
+def select_star_edges_batch(topo: Topology.MeshTopology, centers, outer=True):
+    """select_star_edges for many centers at once, as an array of unique edge indices.
+
+    Ring membership is kept per star, so an edge only counts when both of its
+    verts are in the same ring of the same star, even where rings of
+    neighboring stars overlap.
+    """
+    centers = np.asarray(centers, dtype=np.int64)
+    n = topo.num_verts
+    vert_verts = topo.vert_verts
+
+    owner, verts = Topology.expand(vert_verts, centers)
+    inner = np.sort(owner * n + verts)
+    owners, ring_verts, rings = [owner], [verts], [np.zeros(len(owner), dtype=np.int64)]
+    if outer:
+        i, second = Topology.expand(vert_verts, verts)
+        key = np.unique(owner[i] * n + second)
+        key = key[~Topology.contains(inner, key) & (key % n != centers[key // n])]
+        owners.append(key // n)
+        ring_verts.append(key % n)
+        rings.append(np.ones(len(key), dtype=np.int64))
+    owner = np.concatenate(owners)
+    verts = np.concatenate(ring_verts)
+    ring = np.concatenate(rings)
+    members = np.sort((owner * n + verts) * 2 + ring)
+
+    i, edges = Topology.expand(topo.vert_edges, verts)
+    edge_verts = topo.edge_verts[edges]
+    other = np.where(edge_verts[:, 0] == verts[i], edge_verts[:, 1], edge_verts[:, 0])
+    contained = Topology.contains(members, (owner[i] * n + other) * 2 + ring[i])
+    return np.unique(edges[contained])
+
+
+def fix_stars(bm, topo: Topology.MeshTopology, selected, neighbors, outer=True):
+    """Grow the `selected` vert mask to its star lattice and dissolve the star edges.
+
+    `bm` is a BMesh or MeshKernel.Mesh with indices matching `topo`. Returns
+    (star verts, number of edges dissolved); the stars are returned as
+    elements because dissolving changes the indices.
+    """
+    propagate_star_points(selected, lambda verts: neighbors(topo, verts))
+    stars = np.flatnonzero(selected)
+    edges = select_star_edges_batch(topo, stars, outer)
+
+    star_verts = [bm.verts[v] for v in stars]
+    ops, _ = MeshKernel.backend(bm)
+    ops.dissolve_edges(bm, edges=[bm.edges[e] for e in edges], use_verts=True)
+    return star_verts, len(edges)
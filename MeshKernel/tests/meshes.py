@@ -0,0 +1,95 @@
+"""Small test meshes as (coords, faces) lists, and helpers to compare results."""
+import numpy as np
+
+
+def grid(rows, cols):
+    """Quad grid as (coords, faces), vert (cols + 1) * i + j at (j, i)."""
+    co = [(j, i, 0) for i in range(rows + 1) for j in range(cols + 1)]
+    faces = []
+    for i in range(rows):
+        for j in range(cols):
+            a = i * (cols + 1) + j
+            faces.append([a, a + 1, a + cols + 2, a + cols + 1])
+    return co, faces
+
+
+def broken_grid(rows, cols, every=5):
+    """Quad grid with every `every`-th quad split into two triangles, alternating the diagonal.
+
+    Returns (coords, quads, broken faces).
+    """
+    co, faces = grid(rows, cols)
+    broken = []
+    for k, (a, b, c, d) in enumerate(faces):
+        if k % every:
+            broken.append([a, b, c, d])
+        elif k // every % 2:
+            broken += [[a, b, c], [a, c, d]]
+        else:
+            broken += [[a, b, d], [b, c, d]]
+    return co, faces, broken
+
+
+def torus(rows, cols):
+    """Closed quad torus, every vert of valence 4."""
+    co = []
+    for i in range(rows):
+        for j in range(cols):
+            u = 2 * np.pi * i / rows
+            v = 2 * np.pi * j / cols
+            co.append(((2 + np.cos(v)) * np.cos(u), (2 + np.cos(v)) * np.sin(u), np.sin(v)))
+    faces = []
+    for i in range(rows):
+        for j in range(cols):
+            a = i * cols + j
+            b = i * cols + (j + 1) % cols
+            c = (i + 1) % rows * cols + (j + 1) % cols
+            d = (i + 1) % rows * cols + j
+            faces.append([a, b, c, d])
+    return co, faces
+
+
+def cube():
+    """Closed quad cube, every vert of valence 3."""
+    co = [(x, y, z) for z in (0, 1) for y in (0, 1) for x in (0, 1)]
+    faces = [[0, 2, 3, 1], [4, 5, 7, 6], [0, 1, 5, 4], [2, 6, 7, 3], [0, 4, 6, 2], [1, 3, 7, 5]]
+    return co, faces
+
+
+def tri_strips(length, count=1, closed=False):
+    """`count` separate strips of 2 * `length` triangles.
+
+    Strip k has bottom verts b(i) and top verts t(i); closed strips wrap
+    around into a ring. Returns (coords, faces, b, t).
+    """
+    ring = length if closed else length + 1
+
+    def b(i, k=0):
+        return 2 * ring * k + i % ring
+
+    def t(i, k=0):
+        return 2 * ring * k + ring + i % ring
+
+    co = []
+    faces = []
+    for k in range(count):
+        co += [(i, 2 * k, 0) for i in range(ring)] + [(i, 2 * k + 1, 0) for i in range(ring)]
+        for i in range(length):
+            faces += [[b(i, k), b(i + 1, k), t(i, k)], [b(i + 1, k), t(i + 1, k), t(i, k)]]
+    return co, faces, b, t
+
+
+def face_sets(mesh):
+    """The faces of `mesh` as a set of vert tuples, rotated to start at the smallest vert."""
+    _, faces = mesh.to_pydata()
+    out = set()
+    for f in faces:
+        k = f.index(min(f))
+        out.add(tuple(f[k:] + f[:k]))
+    return out
+
+
+def edge_index(topo, a, b):
+    """Index of the edge between verts `a` and `b` of a Topology.MeshTopology."""
+    edge_verts = np.sort(topo.edge_verts, axis=1)
+    return int(np.flatnonzero((edge_verts[:, 0] == min(a, b)) & (edge_verts[:, 1] == max(a, b)))[0])
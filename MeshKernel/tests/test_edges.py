@@ -0,0 +1,198 @@
+"""The array edge walks against the per-element walks they replaced:
+
+    python -m pytest
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import Benchmarks
+import MeshKernel
+from MeshKernel import edges
+from MeshKernel.tests.meshes import cube, edge_index, grid, torus, tri_strips
+
+ACTIONS = [
+    ("1", "1", "1", "0", "0"),
+    ("0", "1", "0", "1", "0"),
+    ("1", "0", "1", "2", "1"),
+    ("0", "0", "0", "0", "0"),
+]
+
+
+def propagate_reference(mesh, seeds, action3, action4, action5, actionEven, actionOdd):
+    """AdvEdgeSelect's original walk over elements, as a set of edge indices."""
+    selected = set()
+    to_explore = []
+
+    def select_edge(edge):
+        if len(edge.link_faces) == 1:
+            return
+        selected.add(edge)
+        for v in edge.verts:
+            n = len(v.link_edges)
+            other_edges = [e for e in v.link_edges if e != edge]
+            if n == 2:
+                to_explore.extend(other_edges)
+            if n == 3 and action3 == "1":
+                to_explore.extend(other_edges)
+            if n == 4 and action4 == "1":
+                to_explore.append(edges.ordered_edge_list(v, edge)[2])
+            if n == 5 and action5 == "1":
+                to_explore.extend(other_edges)
+            if n >= 6 and n % 2 == 0:
+                if actionEven == "1":
+                    to_explore.append(edges.ordered_edge_list(v, edge)[n // 2])
+                if actionEven == "2":
+                    to_explore.extend(edges.ordered_edge_list(v, edge)[2::2])
+            if n >= 7 and n % 2 == 1 and actionOdd == "1":
+                to_explore.extend(other_edges)
+
+    for e in seeds:
+        select_edge(e)
+    while to_explore:
+        e = to_explore.pop(0)
+        if e not in selected:
+            select_edge(e)
+    return {e.index for e in selected}
+
+
+def zigzag_reference(a, b):
+    """ZigZagSelect's original walk from the selected edges `a` and `b`, as (edge, face) index sets."""
+    selected = {a, b}
+    face = (set(a.link_faces) & set(b.link_faces)).pop()
+    faces = {face}
+
+    def walk(prev_edge, face, edge):
+        while len(edge.link_faces) == 2:
+            next_face = [f for f in edge.link_faces if f != face][0]
+            next_edge = [e for e in next_face.edges if not set(prev_edge.verts) & set(e.verts)][0]
+            faces.add(next_face)
+            if next_edge in selected:
+                break
+            selected.add(next_edge)
+            prev_edge, edge, face = edge, next_edge, next_face
+
+    walk(a, face, b)
+    walk(b, face, a)
+    return {e.index for e in selected}, {f.index for f in faces}
+
+
+def closed_meshes():
+    return [MeshKernel.from_pydata(*cube()), MeshKernel.from_pydata(*torus(6, 8)), Benchmarks.star_lattice(320)]
+
+
+class PropagateEdgesTest(unittest.TestCase):
+    def test_same_as_per_element(self):
+        for mesh in closed_meshes():
+            topo = mesh.topology()
+            blocked = topo.edge_faces.degree() == 1
+            seeds = np.random.RandomState(0).choice(topo.num_edges, 3, replace=False)
+            for actions in ACTIONS:
+                selected = np.zeros(topo.num_edges, dtype=bool)
+                selected[seeds] = True
+                edges.propagate_edges(edges.next_edge_table(topo, *actions), selected, blocked)
+                expected = propagate_reference(mesh, [mesh.edges[int(e)] for e in seeds], *actions)
+                self.assertEqual(set(np.flatnonzero(selected).tolist()), expected, actions)
+
+    def test_boundary_blocks(self):
+        mesh = MeshKernel.from_pydata(*grid(4, 4))
+        topo = mesh.topology()
+        blocked = topo.edge_faces.degree() == 1
+        seed = next(e for e in mesh.edges if len(e.link_faces) == 2 and all(len(v.link_edges) == 4 for v in e.verts))
+        selected = np.zeros(topo.num_edges, dtype=bool)
+        selected[seed.index] = True
+        edges.propagate_edges(edges.next_edge_table(topo, *ACTIONS[0]), selected, blocked)
+        self.assertFalse((selected & blocked).any())
+        self.assertEqual(set(np.flatnonzero(selected).tolist()), propagate_reference(mesh, [seed], *ACTIONS[0]))
+
+
+class FanTest(unittest.TestCase):
+    def test_same_as_ordered_edge_list(self):
+        for mesh in closed_meshes():
+            topo = mesh.topology()
+            self.assertTrue(topo.fan_closed.all())
+            for v in mesh.verts:
+                fan = topo.vert_fan[v.index].tolist()
+                ordered = [e.index for e in edges.ordered_edge_list(v, mesh.edges[fan[0]])]
+                # A closed fan ends where it started; either way round, depending on the winding.
+                self.assertEqual(ordered[-1], ordered[0])
+                self.assertIn(ordered[:-1], (fan, fan[:1] + fan[:0:-1]))
+                for k, e in enumerate(fan):
+                    side = int(topo.edge_verts[e, 0] != v.index)
+                    self.assertEqual(topo.fan_pos[e, side], k)
+
+    def test_boundary_is_open(self):
+        topo = MeshKernel.from_pydata(*grid(3, 3)).topology()
+        interior = [5, 6, 9, 10]
+        self.assertEqual(np.flatnonzero(topo.fan_closed).tolist(), interior)
+
+
+class ZigzagTest(unittest.TestCase):
+    def seeds(self, topo, b, t, strips):
+        """Select the zigzag edges t(1)-b(2) and b(2)-t(2) in each strip."""
+        selected = np.zeros(topo.num_edges, dtype=bool)
+        for k in strips:
+            selected[[edge_index(topo, t(1, k), b(2, k)), edge_index(topo, b(2, k), t(2, k))]] = True
+        return selected
+
+    def check_strip(self, topo, strip, edge_set):
+        # Consecutive verts of a strip are the zigzag's edges.
+        steps = {edge_index(topo, a, b) for a, b in zip(strip[:-1].tolist(), strip[1:].tolist())}
+        self.assertEqual(len(steps), len(strip) - 1)
+        self.assertTrue(steps <= edge_set)
+
+    def test_same_as_per_element(self):
+        for closed in (False, True):
+            co, faces, b, t = tri_strips(6, count=3, closed=closed)
+            mesh = MeshKernel.from_pydata(co, faces)
+            topo = mesh.topology()
+            selected = self.seeds(topo, b, t, range(3))
+
+            strips, walked, walked_faces = edges.zigzag_strips(topo, selected)
+            self.assertEqual(len(strips), 3)
+            expected_edges, expected_faces = set(), set()
+            for k in range(3):
+                a, c = (mesh.edges[e] for e in np.flatnonzero(self.seeds(topo, b, t, [k])))
+                e, f = zigzag_reference(a, c)
+                expected_edges |= e
+                expected_faces |= f
+            edge_set = set(np.flatnonzero(selected).tolist()) | set(walked.tolist())
+            self.assertEqual(edge_set, expected_edges)
+            self.assertEqual(set(walked_faces.tolist()), expected_faces)
+            for strip in strips:
+                self.check_strip(topo, strip, edge_set)
+                if closed:
+                    self.assertEqual(strip[0], strip[-1])
+                    self.assertEqual(len(strip), 2 * 6 + 1)
+                else:
+                    self.assertEqual(len(strip), 2 * 6 + 2)
+
+    def test_rerun_on_selected_zigzag(self):
+        for closed in (False, True):
+            co, faces, b, t = tri_strips(6, closed=closed)
+            topo = MeshKernel.from_pydata(co, faces).topology()
+            selected = self.seeds(topo, b, t, [0])
+            first, walked, _ = edges.zigzag_strips(topo, selected)
+            selected[walked] = True
+
+            strips, walked, _ = edges.zigzag_strips(topo, selected)
+            self.assertEqual(len(strips), 1)
+            self.assertEqual(len(walked), 0)
+            self.assertEqual(len(strips[0]), len(first[0]))
+            self.check_strip(topo, strips[0], set(np.flatnonzero(selected).tolist()))
+
+    def test_no_seeds(self):
+        co, faces, _, _ = tri_strips(3)
+        topo = MeshKernel.from_pydata(co, faces).topology()
+        strips, walked, walked_faces = edges.zigzag_strips(topo, np.zeros(topo.num_edges, dtype=bool))
+        self.assertEqual((strips, len(walked), len(walked_faces)), ([], 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""MeshKernel construction, editing and compaction. Runs under plain CPython:
+
+    python -m pytest
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import MeshKernel
+import Topology
+from MeshKernel.tests.meshes import grid, face_sets
+
+
+class FromPydataTest(unittest.TestCase):
+    def test_round_trip(self):
+        co = [(0, 0, 0), (1, 0, 0), (2, 0, 0), (0, 1, 0), (1, 1, 0), (2, 1, 0)]
+        faces = [[0, 1, 4, 3], [1, 2, 5], [1, 5, 4]]
+        mesh = MeshKernel.from_pydata(co, faces)
+
+        out_co, out_faces = mesh.to_pydata()
+        np.testing.assert_array_equal(out_co, co)
+        self.assertEqual(out_faces, faces)
+        self.assertEqual((len(mesh.verts), len(mesh.edges), len(mesh.faces)), (6, 8, 3))
+
+    def test_adjacency(self):
+        mesh = MeshKernel.from_pydata(*grid(2, 2))
+        center = mesh.verts[4]
+        self.assertEqual(len(center.link_edges), 4)
+        self.assertEqual(len(center.link_faces), 4)
+        self.assertEqual(len(mesh.verts[0].link_faces), 1)
+        boundary = [e for e in mesh.edges if len(e.link_faces) == 1]
+        self.assertEqual(len(boundary), 8)
+        for edge in mesh.edges:
+            a, b = edge.verts
+            self.assertEqual(edge.other_vert(a), b)
+
+    def test_topology_matches_pydata(self):
+        co, faces = grid(3, 2)
+        topo = MeshKernel.from_pydata(co, faces).topology()
+        self.assertEqual((topo.num_verts, topo.num_faces), (len(co), len(faces)))
+        np.testing.assert_array_equal(topo.loop_verts, np.concatenate(faces))
+
+
+class EditTest(unittest.TestCase):
+    def test_face_split(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 1))
+        quad = mesh.faces[0]
+        a, b = mesh.verts[0], mesh.verts[3]
+        face, loop = MeshKernel.face_split(quad, a, b)
+
+        self.assertIsInstance(face, MeshKernel.Face)
+        self.assertIsInstance(loop, MeshKernel.Loop)
+        # Like the BMLoop bmesh.utils.face_split returns.
+        self.assertEqual(loop.face, face)
+        self.assertEqual(loop.vert, a)
+        self.assertEqual(set(loop.edge.verts), {a, b})
+        self.assertEqual(loop.link_loop_radial_next.face, quad)
+        self.assertEqual(loop.link_loop_next.vert, b)
+
+        self.assertEqual((len(mesh.faces), len(mesh.edges)), (2, 5))
+        self.assertEqual([len(f.verts) for f in mesh.faces], [3, 3])
+        self.assertEqual(face_sets(mesh), {(0, 1, 3), (0, 3, 2)})
+
+    def test_face_split_adjacent_verts(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 1))
+        with self.assertRaises(ValueError):
+            MeshKernel.face_split(mesh.faces[0], mesh.verts[0], mesh.verts[1])
+
+    def test_face_join(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 1))
+        MeshKernel.face_split(mesh.faces[0], mesh.verts[0], mesh.verts[3])
+        face = MeshKernel.face_join(list(mesh.faces))
+        self.assertEqual(len(face.verts), 4)
+        self.assertEqual((len(mesh.faces), len(mesh.edges)), (1, 4))
+        self.assertEqual(face_sets(mesh), {(0, 1, 3, 2)})
+
+    def test_dissolve_edges(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 3))
+        inner = [e for e in mesh.edges if len(e.link_faces) == 2]
+        self.assertEqual(len(inner), 2)
+        res = MeshKernel.dissolve_edges(mesh, inner)
+
+        self.assertEqual(len(res['region']), 1)
+        self.assertEqual(len(res['region'][0].verts), 8)
+        self.assertEqual((len(mesh.verts), len(mesh.edges), len(mesh.faces)), (8, 8, 1))
+
+    def test_dissolve_edges_use_verts(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 2))
+        inner = [e for e in mesh.edges if len(e.link_faces) == 2]
+        res = MeshKernel.dissolve_edges(mesh, inner, use_verts=True)
+        # The verts at both ends of the dissolved edge are left with two edges and go too.
+        self.assertEqual(len(res['region'][0].verts), 4)
+        self.assertEqual((len(mesh.verts), len(mesh.edges), len(mesh.faces)), (4, 4, 1))
+
+    def test_dissolve_skips_boundary(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 1))
+        res = MeshKernel.dissolve_edges(mesh, list(mesh.edges))
+        self.assertEqual(res['region'], [])
+        self.assertEqual(len(mesh.faces), 1)
+
+
+class IndexTest(unittest.TestCase):
+    def dissolved(self):
+        mesh = MeshKernel.from_pydata(*grid(2, 2))
+        edge = next(e for e in mesh.edges if len(e.link_faces) == 2)
+        face = next(f for f in mesh.faces if edge not in f.edges)
+        MeshKernel.dissolve_edges(mesh, [edge])
+        return mesh, face
+
+    def test_index_update_keeps_wrappers(self):
+        mesh, face = self.dissolved()
+        held = list(mesh.faces)
+        Topology.lookup(mesh)
+
+        self.assertTrue(face.is_valid)
+        self.assertTrue(all(f.is_valid for f in held))
+        self.assertEqual([f.index for f in mesh.faces], list(range(3)))
+        for seq in (mesh.verts, mesh.edges, mesh.faces):
+            self.assertEqual([seq[i].index for i in range(len(seq))], list(range(len(seq))))
+
+    def test_topology_keeps_wrappers(self):
+        mesh, face = self.dissolved()
+        topo = mesh.topology()
+        self.assertTrue(face.is_valid)
+        self.assertEqual(topo.num_faces, 3)
+        self.assertEqual(list(topo.loop_verts[topo.loop_start[face.index]:][:4]),
+                         [v.index for v in face.verts])
+
+    def test_compact_invalidates_wrappers(self):
+        mesh, face = self.dissolved()
+        before = face_sets(mesh)
+        vert = mesh.verts[0]
+        generation = mesh.generation
+
+        mesh.compact()
+        self.assertEqual(mesh.generation, generation + 1)
+        self.assertFalse(face.is_valid)
+        self.assertFalse(vert.is_valid)
+        with self.assertRaises(ReferenceError):
+            face.verts
+        self.assertEqual(face_sets(mesh), before)
+        self.assertEqual(mesh.face_data.count, 3)
+        self.assertTrue(mesh.faces[0].is_valid)
+
+    def test_compact_without_edits(self):
+        mesh = MeshKernel.from_pydata(*grid(1, 1))
+        face = mesh.faces[0]
+        mesh.compact()
+        self.assertTrue(face.is_valid)
+
+    def test_iteration_during_compact(self):
+        mesh, _ = self.dissolved()
+        with self.assertRaises(RuntimeError):
+            for _ in mesh.faces:
+                mesh.compact()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""FaceExplorer on MeshKernel meshes, and against bmesh when run inside Blender;
+pair_strip against FixQuadStrip's original per-face loop:
+
+    python -m pytest
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import MeshKernel
+from MeshKernel import quads
+
+from MeshKernel.tests.meshes import broken_grid, face_sets, grid, tri_strips
+
+try:
+    import bmesh
+except ImportError:
+    bmesh = None
+
+
+def pair_reference(faces):
+    """FixQuadStrip's original loop: pair a face with its only selected neighbor until none is left."""
+    faces = list(faces)
+    edges = []
+    while True:
+        for face in faces:
+            links = [(e, n) for e in face.edges for n in e.link_faces if n != face and n in faces]
+            if len(links) == 1:
+                edge, other = links[0]
+                edges.append(edge.index)
+                faces.remove(face)
+                faces.remove(other)
+                break
+        else:
+            return edges, faces
+
+
+def explore(mesh, batch):
+    """Run FaceExplorer from all quads of `mesh` like FixQuads does from the selected ones."""
+    fe = quads.FaceExplorer(mesh, {f for f in mesh.faces if len(f.verts) == 4}, batch)
+    quads.explore(fe)
+    return fe
+
+
+class FaceExplorerTest(unittest.TestCase):
+    def test_restores_grid(self):
+        co, faces, broken = broken_grid(6, 6)
+        for batch in (False, True):
+            mesh = MeshKernel.from_pydata(co, broken)
+            fe = explore(mesh, batch)
+            self.assertEqual(face_sets(mesh), face_sets(MeshKernel.from_pydata(co, faces)))
+            self.assertEqual(fe.stats['dissolved'], len(broken) - len(faces))
+            self.assertEqual({f for f in fe.correct_faces if f.is_valid}, set(mesh.faces))
+
+    def test_correct_faces_survive_lookup(self):
+        co, faces, broken = broken_grid(4, 4)
+        mesh = MeshKernel.from_pydata(co, broken)
+        fe = explore(mesh, False)
+        held = [f for f in fe.correct_faces if f.is_valid]
+        mesh.topology()
+        self.assertTrue(all(f.is_valid for f in held))
+        self.assertEqual(len(held), len(faces))
+
+    @unittest.skipIf(bmesh is None, "needs Blender's bmesh")
+    def test_same_as_bmesh(self):
+        co, faces, broken = broken_grid(6, 6)
+        mesh = MeshKernel.from_pydata(co, broken)
+        explore(mesh, True)
+
+        bm = bmesh.new()
+        verts = [bm.verts.new(c) for c in co]
+        for f in broken:
+            bm.faces.new([verts[v] for v in f])
+        explore(bm, True)
+        bm_faces = set()
+        for f in bm.faces:
+            f = [v.index for v in f.verts]
+            k = f.index(min(f))
+            bm_faces.add(tuple(f[k:] + f[:k]))
+        bm.free()
+        self.assertEqual(face_sets(mesh), bm_faces)
+
+
+class PairStripTest(unittest.TestCase):
+    def pair(self, mesh, faces):
+        topo = mesh.topology()
+        selected = np.zeros(topo.num_faces, dtype=bool)
+        selected[[f.index for f in faces]] = True
+        return quads.pair_strip(quads.strip_links(topo, selected))
+
+    def test_same_as_per_face(self):
+        co, faces, _, _ = tri_strips(5, count=3)
+        mesh = MeshKernel.from_pydata(co, faces)
+        edges, leftover = self.pair(mesh, mesh.faces)
+        expected, left = pair_reference(mesh.faces)
+        self.assertEqual(sorted(edges), sorted(expected))
+        self.assertEqual((leftover, left), ({}, []))
+
+    def test_odd_strip(self):
+        co, faces, _, _ = tri_strips(3)
+        mesh = MeshKernel.from_pydata(co, faces)
+        # Drop the last triangle: five faces leave one unpaired.
+        strip = list(mesh.faces)[:-1]
+        edges, leftover = self.pair(mesh, strip)
+        expected, left = pair_reference(strip)
+        self.assertEqual(len(edges), len(expected))
+        self.assertEqual(len(leftover), len(left))
+
+    def test_cycle(self):
+        co, faces, _, _ = tri_strips(4, closed=True)
+        mesh = MeshKernel.from_pydata(co, faces)
+        edges, leftover = self.pair(mesh, mesh.faces)
+        self.assertEqual(edges, [])
+        self.assertEqual(set(leftover.values()), {2})
+        self.assertEqual(pair_reference(mesh.faces)[0], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
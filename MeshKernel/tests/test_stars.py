@@ -0,0 +1,55 @@
+"""The batched star point functions against their one-vert versions:
+
+    python -m pytest
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import Benchmarks
+from MeshKernel import stars
+
+
+def meshes():
+    return [Benchmarks.star_lattice(320), Benchmarks.tri_grid(200), Benchmarks.broken_quads(100)]
+
+
+class StarPointTest(unittest.TestCase):
+    def test_mask(self):
+        for mesh in meshes():
+            topo = mesh.topology()
+            expected = [stars.is_star_point(topo, v) if len(topo.vert_verts[v]) else False
+                        for v in range(topo.num_verts)]
+            np.testing.assert_array_equal(stars.star_point_mask(topo, chunk=64), expected)
+            valence = topo.vert_verts.degree()
+            np.testing.assert_array_equal(stars.star_point_mask(topo, valence=5), expected & (valence == 5))
+
+    def test_neighbor_star_points(self):
+        for mesh in meshes():
+            topo = mesh.topology()
+            verts = np.arange(topo.num_verts)
+            owner, star = stars.neighbor_star_points_batch(topo, verts)
+            for v in verts.tolist():
+                self.assertEqual(sorted(star[owner == v].tolist()), sorted(stars.neighbor_star_points(topo, v)))
+
+    def test_select_star_edges(self):
+        for mesh in meshes():
+            topo = mesh.topology()
+            centers = np.random.RandomState(0).choice(topo.num_verts, 10, replace=False)
+            for outer in (True, False):
+                expected = set()
+                for c in centers.tolist():
+                    expected |= stars.select_star_edges(topo, c, outer)
+                got = stars.select_star_edges_batch(topo, centers, outer)
+                self.assertEqual(set(got.tolist()), expected)
+                self.assertEqual(len(got), len(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
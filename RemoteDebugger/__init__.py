@@ -10,6 +10,15 @@ addon preferences screen.
 
 For more information on how to use this addon, please read my article at
 http://code.blender.org/2015/10/debugging-python-code-with-pycharm/
+
+Both connect operators can trace scoped: the debugger then only traces while
+the chosen operators (by bl_idname, comma separated) execute, instead of
+slowing down everything that runs after connecting.
+
+"Profile next operator runs" needs no IDE: it profiles the next runs of the
+Snail operators with a sampling profiler (cProfile as a fallback) and writes
+the collapsed stacks or pstats to the profile directory set in the addon
+preferences, the temporary directory by default.
 """
 
 bl_info = {
@@ -23,8 +32,14 @@ bl_info = {
 
 import bpy
 import os.path
+import tempfile
 from bpy.types import AddonPreferences
-from bpy.props import StringProperty
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
+
+import Loader
+
+profiling = Loader.lazy("Instrumentation.profiling")
+tracing = Loader.lazy("Instrumentation.tracing")
 
 
 def addon_preferences(context):
@@ -55,18 +70,58 @@ class DebuggerAddonPreferences(AddonPreferences):
         default='pydevd.py'
     )
 
+    traceoperators: StringProperty(
+        name='Traced operators',
+        description='Comma separated bl_idnames the debugger traces when connecting scoped',
+        default='object.fix_quads'
+    )
+
+    profiledir: StringProperty(
+        name='Profile directory',
+        description='Where profiles are written, the temporary directory when empty',
+        subtype='DIR_PATH',
+        default=''
+    )
+
     def draw(self, context):
         layout = self.layout
         layout.prop(self, 'pydevpath')
         layout.prop(self, 'eggpath')
+        layout.prop(self, 'traceoperators')
+        layout.prop(self, 'profiledir')
         layout.label(text='Make sure you select the egg for Python 3.x: pycharm-debug-py3k.egg ')
 
 
+def scope_tracing(operator, context):
+    """After pydevd.settrace(): when the operator is scoped, trace only its chosen operators."""
+    # The new connection replaces an earlier scoped one.
+    tracing.unscope(restore=False)
+    if not operator.scoped:
+        return
+    names = operator.operators
+    if not names:
+        try:
+            names = addon_preferences(context).traceoperators
+        except KeyError:
+            names = ''
+    idnames = [name.strip() for name in names.split(',') if name.strip()]
+    if not idnames:
+        operator.report({'WARNING'}, 'No operators to trace given, tracing everything')
+        return
+    tracing.scope(idnames)
+    operator.report({'INFO'}, 'Tracing only %s' % ', '.join(idnames))
+
+
 class DEBUG_OT_connect_debugger_pycharm(bpy.types.Operator):
     bl_idname = 'debug.connect_debugger_pycharm'
     bl_label = 'Connect to remote PyCharm debugger'
     bl_description = 'Connects to a PyCharm debugger on localhost:1090'
 
+    scoped: BoolProperty(name='Scoped', description='Only trace while the chosen operators execute',
+                         default=False)
+    operators: StringProperty(name='Operators', description='Comma separated bl_idnames to trace when '
+                                                            'scoped, the addon preference when empty')
+
     def execute(self, context):
         import sys
 
@@ -84,6 +139,7 @@ class DEBUG_OT_connect_debugger_pycharm(bpy.types.Operator):
         import pydevd
         pydevd.settrace('localhost', port=1090, stdoutToServer=True, stderrToServer=True,
                         suspend=False)
+        scope_tracing(self, context)
 
         return {'FINISHED'}
 
@@ -93,6 +149,11 @@ class DEBUG_OT_connect_debugger_pydev(bpy.types.Operator):
     bl_label = 'Connect to remote PyDev debugger'
     bl_description = 'Connects to a PyDev debugger on localhost:5678'
 
+    scoped: BoolProperty(name='Scoped', description='Only trace while the chosen operators execute',
+                         default=False)
+    operators: StringProperty(name='Operators', description='Comma separated bl_idnames to trace when '
+                                                            'scoped, the addon preference when empty')
+
     def execute(self, context):
         import sys
 
@@ -112,19 +173,65 @@ class DEBUG_OT_connect_debugger_pydev(bpy.types.Operator):
         import pydevd
         pydevd.settrace('localhost', port=5678, stdoutToServer=True, stderrToServer=True,
                         suspend=False)
+        scope_tracing(self, context)
+
+        return {'FINISHED'}
+
+
+def profile_directory(context):
+    try:
+        profiledir = addon_preferences(context).profiledir
+    except KeyError:
+        # Registered as part of another addon, without our own preferences.
+        profiledir = ''
+    return bpy.path.abspath(profiledir) if profiledir else tempfile.gettempdir()
+
+
+class DEBUG_OT_profile_operators(bpy.types.Operator):
+    bl_idname = 'debug.profile_operators'
+    bl_label = 'Profile next operator runs'
+    bl_description = 'Profiles the next runs of the Snail operators and writes the profiles to the profile directory'
+
+    count: IntProperty(name='Runs', description='Number of operator runs to profile', default=1, min=1)
+    sampling: BoolProperty(name='Sampling', description='Sample the stack instead of tracing every call '
+                                                        'with cProfile', default=True)
+    interval: FloatProperty(name='Interval', description='Milliseconds between samples',
+                            default=5.0, min=0.1)
 
+    def execute(self, context):
+        directory = profile_directory(context)
+        hook = profiling.profile_next(self.count, directory, self.sampling, self.interval / 1000)
+        self.report({'INFO'}, 'Profiling the next %d operator runs with %s into %s' % (
+            self.count, 'sampling' if hook.sampling else 'cProfile', directory))
+        return {'FINISHED'}
+
+
+class DEBUG_OT_stop_profiling(bpy.types.Operator):
+    bl_idname = 'debug.stop_profiling'
+    bl_label = 'Stop profiling operator runs'
+    bl_description = 'Drops a pending "Profile next operator runs" request'
+
+    def execute(self, context):
+        remaining = profiling.stop()
+        self.report({'INFO'}, 'Stopped profiling, %d runs were left' % remaining)
         return {'FINISHED'}
 
 
 def register():
     bpy.utils.register_class(DEBUG_OT_connect_debugger_pycharm)
     bpy.utils.register_class(DEBUG_OT_connect_debugger_pydev)
+    bpy.utils.register_class(DEBUG_OT_profile_operators)
+    bpy.utils.register_class(DEBUG_OT_stop_profiling)
     bpy.utils.register_class(DebuggerAddonPreferences)
 
 
 def unregister():
+    profiling.stop()
+    tracing.unscope()
     bpy.utils.unregister_class(DEBUG_OT_connect_debugger_pycharm)
     bpy.utils.unregister_class(DEBUG_OT_connect_debugger_pydev)
+    bpy.utils.unregister_class(DEBUG_OT_profile_operators)
+    bpy.utils.unregister_class(DEBUG_OT_stop_profiling)
     bpy.utils.unregister_class(DebuggerAddonPreferences)
 
 
@@ -6,6 +6,13 @@ bl_info = {
 import bpy
 import bmesh
 
+import Instrumentation
+import Loader
+
+np = Loader.lazy("numpy")
+Topology = Loader.lazy("Topology")
+quads = Loader.lazy("MeshKernel.quads")
+
 
 class SelectLinkedQuads(bpy.types.Operator):
     """Tooltip"""
@@ -16,32 +23,21 @@ class SelectLinkedQuads(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         obj = context.active_object
 
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
+
+        labels, a, b = quads.quad_labels(topo)
+        selected = Topology.read_selection(me.polygons)
 
-        to_explore = []
-
-        def select_face(face):
-            face.select = True
-            for edge in face.edges:
-                for f in edge.link_faces:
-                    if f != face:
-                        to_explore.append(f)
-
-        for face in bm.faces:
-            if face.select:
-                select_face(face)
-
-        while to_explore:
-            print(len(to_explore))
-            f = to_explore.pop(0)
-            if f.select:
-                continue
-            if len(f.edges) == 4:
-                select_face(f)
+        result = quads.linked_quad_faces(labels, a, b, selected)
+        for i in np.flatnonzero(result & ~selected):
+            bm.faces[i].select = True
 
         bmesh.update_edit_mesh(me)
         me.update()
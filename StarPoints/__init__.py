@@ -1,8 +1,3 @@
-import itertools
-from collections import defaultdict
-
-from typing import Set, Optional, List
-
 bl_info = {
     "name": "Select star points",
     "category": "Object",
@@ -10,130 +5,38 @@ bl_info = {
 }
 import bpy
 import bmesh
-import random
-
-
-def neighbor_faces(face: bmesh.types.BMFace):
-    f: Set[bmesh.types.BMFace] = set()
-    for e in face.edges:
-        f.update(e.link_faces)
-    f.remove(face)
-    return f
-
-
-def neighbor_verts(vert: bmesh.types.BMVert):
-    f: Set[bmesh.types.BMVert] = set()
-    for e in vert.link_edges:
-        f.update(e.verts)
-    f.remove(vert)
-    return f
-
-
-def triangle_opposite_edge(triangle: bmesh.types.BMFace, vert: bmesh.types.BMVert):
-    if len(triangle.edges) != 3:
-        triangle.select = True
-
-        assert len(triangle.edges) == 3
-    assert vert in triangle.verts
-    for e in triangle.edges:
-        if vert not in e.verts:
-            return e
-def triangle_opposite_vert(triangle: bmesh.types.BMFace, edge: bmesh.types.BMEdge):
-    if len(triangle.edges) != 3:
-        triangle.select = True
-        assert len(triangle.edges) == 3
-    assert edge in triangle.edges
-    for v in triangle.verts:
-        if v not in edge.verts:
-            return v
-
-
-def is_star_point(vert: bmesh.types.BMVert):
-    n1 = neighbor_verts(vert)
-    n2 = set()
-    for n in n1:
-        n2.update(neighbor_verts(n))
-    n2.difference_update(n1)
-    n2.remove(vert)
-    return len(n2) == 2 * len(n1)
-
-def edge_opposite_face(edge: bmesh.types.BMEdge, face:bmesh.types.BMFace):
-    assert face in edge.link_faces
-    if len(edge.link_faces) == 1:
-        return None
-    assert len(edge.link_faces) == 2
-
-    if edge.link_faces[0] == face:
-        return edge.link_faces[1]
-    return edge.link_faces[0]
-
-def neighbor_star_points_small(vert: bmesh.types.BMVert):
-    faces = vert.link_faces
-    res = []
-    for f in faces:
-        e = triangle_opposite_edge(f, vert)
-        t2 = edge_opposite_face(e, f)
-        if t2 == None:
-            continue
-        v = triangle_opposite_vert(t2, e)
-        res.append(v)
-    return res
-
-def neighbor_star_points(vert: bmesh.types.BMVert):
-    count = defaultdict(int)
-    n0 = set([vert])
-    count[vert.index] = 1
-
-    n1 = set()
-    for v in n0:
-        for n in neighbor_verts(v) - n0:
-            count[n.index] += count[v.index]
-            n1.add(n)
-
-    n2 = set()
-    for v in n1 - n0:
-        for n in neighbor_verts(v) - n1 - n0:
-            count[n.index] += count[v.index]
-            n2.add(n)
-
-    n3 = set()
-    for v in n2 - n1 - n0:
-        for n in neighbor_verts(v) - n2 - n1 - n0:
-            count[n.index] += count[v.index]
-            n3.add(n)
-
-    n4 = set()
-    for v in n3 - n2 - n1 - n0:
-        for n in neighbor_verts(v) - n3 - n2 - n1 - n0:
-            count[n.index] += count[v.index]
-            n4.add(n)
-
-    m = max([count[n.index] for n in n4])
-    return [n for n in n4 if count[n.index] == 6]
-
-
-def select_contained_edges(verts: Set[bmesh.types.BMVert]):
-    res = []
-    for v in verts:
-        for e in v.link_edges:
-            if verts.issuperset(set(e.verts)):
-                res.append(e)
-    return res
-
-
-def select_star_edges(center: bmesh.types.BMVert, outer=True):
-    inner_verts = neighbor_verts(center)
-    edges = select_contained_edges(inner_verts)
-
-    if outer:
-        outer_verts = set()
-        for v in inner_verts:
-            outer_verts.update(neighbor_verts(v))
-        outer_verts -= inner_verts
-        outer_verts.remove(center)
-        edges += select_contained_edges(outer_verts)
-
-    return edges
+
+import Instrumentation
+import Loader
+
+np = Loader.lazy("numpy")
+Topology = Loader.lazy("Topology")
+star_points = Loader.lazy("MeshKernel.stars")
+
+
+def fix_star_mesh(context: bpy.types.Context, obj: bpy.types.Object, neighbors, outer):
+    """Find the star lattice of the selection and dissolve its star edges on one BMesh.
+
+    This is select_star_points, select_star_edges and dissolve_edges fused
+    into a single pass with one edit mesh update. Returns (stars, edges).
+    """
+    me = obj.data
+    topo = Topology.get(obj)
+    bm = bmesh.from_edit_mesh(me)
+    Topology.lookup(bm)
+
+    star_verts, edges = star_points.fix_stars(bm, topo, Topology.read_selection(me.vertices), neighbors, outer)
+
+    context.tool_settings.mesh_select_mode = (True, False, False)
+    bm.select_mode = {'VERT'}
+    for v in star_verts:
+        if v.is_valid:
+            v.select = True
+    bm.select_flush_mode()
+
+    bmesh.update_edit_mesh(me)
+    Topology.invalidate(me)
+    return len(star_verts), edges
 
 
 class SelectStarEdges(bpy.types.Operator):
@@ -146,6 +49,7 @@ class SelectStarEdges(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
@@ -153,14 +57,15 @@ class SelectStarEdges(bpy.types.Operator):
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
 
-        stars: List[bmesh.types.BMVert] = [vert for vert in bm.verts if vert.select]
+        stars = np.flatnonzero(Topology.read_selection(me.vertices))
         bpy.ops.mesh.select_mode(use_extend=False, use_expand=False, type='EDGE')
 
-        for v in stars:
-            for e in select_star_edges(v):
-                e.select = True
+        for e in star_points.select_star_edges_batch(topo, stars):
+            bm.edges[e].select = True
 
         bmesh.update_edit_mesh(me)
 
@@ -175,6 +80,7 @@ class SelectStarPoints(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
@@ -182,18 +88,51 @@ class SelectStarPoints(bpy.types.Operator):
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
+
+        initial = Topology.read_selection(me.vertices)
+        selected = initial.copy()
+        rounds, processed = star_points.propagate_star_points(
+            selected, lambda verts: star_points.neighbor_star_points_batch(topo, verts))
+        for v in np.flatnonzero(selected & ~initial):
+            bm.verts[v].select = True
+        self.report({'INFO'}, "Star points: %d rounds, %d verts processed" % (rounds, processed))
+
+        bmesh.update_edit_mesh(me)
+
+
+class SelectAllStarPoints(bpy.types.Operator):
+    """Select every vert of the mesh that matches the star point pattern"""
+    bl_idname = "object.select_all_star_points"
+    bl_label = "Select all star points"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    valence: bpy.props.IntProperty(name="Valence", description="Only match verts with this many edges, 0 for any",
+                                   default=0, min=0)
 
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'EDIT_MESH'
 
-        again = True
-        while again:
-            again = False
-            stars = [vert for vert in bm.verts if vert.select]
-            for vert in stars:
-                for v in neighbor_star_points(vert):
-                    v.select = True
-                    if v not in stars:
-                        again = True
+    @Instrumentation.operator
+    def execute(self, context):
+        self.main(context)
+        return {'FINISHED'}
+
+    def main(self, context: bpy.context):
+        obj = bpy.context.active_object
+        me = obj.data
+        topo = Topology.get(obj)
+        bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
+
+        selected = Topology.read_selection(me.vertices)
+        stars = star_points.star_point_mask(topo, self.valence)
+        for v in np.flatnonzero(stars & ~selected):
+            bm.verts[v].select = True
+        self.report({'INFO'}, "Star points: %d found" % np.count_nonzero(stars))
 
         bmesh.update_edit_mesh(me)
 
@@ -208,6 +147,7 @@ class SelectStarEdgesSmall(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
@@ -215,14 +155,15 @@ class SelectStarEdgesSmall(bpy.types.Operator):
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
 
-        stars: List[bmesh.types.BMVert] = [vert for vert in bm.verts if vert.select]
+        stars = np.flatnonzero(Topology.read_selection(me.vertices))
         bpy.ops.mesh.select_mode(use_extend=False, use_expand=False, type='EDGE')
 
-        for v in stars:
-            for e in select_star_edges(v, False):
-                e.select = True
+        for e in star_points.select_star_edges_batch(topo, stars, False):
+            bm.edges[e].select = True
 
         bmesh.update_edit_mesh(me)
 
@@ -236,6 +177,7 @@ class SelectStarPointsSmall(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
@@ -243,18 +185,17 @@ class SelectStarPointsSmall(bpy.types.Operator):
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
 
-        again = True
-        while again:
-            again = False
-
-            stars = [vert for vert in bm.verts if vert.select]
-            for vert in stars:
-                for v in neighbor_star_points_small(vert):
-                    v.select = True
-                    if v not in stars:
-                        again = True
+        initial = Topology.read_selection(me.vertices)
+        selected = initial.copy()
+        rounds, processed = star_points.propagate_star_points(
+            selected, lambda verts: star_points.neighbor_star_points_small_batch(topo, verts))
+        for v in np.flatnonzero(selected & ~initial):
+            bm.verts[v].select = True
+        self.report({'INFO'}, "Star points: %d rounds, %d verts processed" % (rounds, processed))
 
         bmesh.update_edit_mesh(me)
 
@@ -269,18 +210,15 @@ class FixStarMesh(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
 
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
-        me = obj.data
-        bm = bmesh.from_edit_mesh(me)
-        bpy.ops.object.select_star_points()
-        bpy.ops.object.select_star_edges()
-        bpy.ops.mesh.dissolve_edges()
-        bpy.ops.mesh.select_mode(use_extend=False, use_expand=False, type='VERT')
+        stars, edges = fix_star_mesh(context, obj, star_points.neighbor_star_points_batch, True)
+        self.report({'INFO'}, "Fixed %d stars, dissolved %d edges" % (stars, edges))
 class FixStarMeshSmall(bpy.types.Operator):
     """Tooltip"""
     bl_idname = "object.fix_star_mesh_small"
@@ -291,18 +229,15 @@ class FixStarMeshSmall(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
 
     def main(self, context: bpy.context):
         obj = bpy.context.active_object
-        me = obj.data
-        bm = bmesh.from_edit_mesh(me)
-        bpy.ops.object.select_star_points_small()
-        bpy.ops.object.select_star_edges_small()
-        bpy.ops.mesh.dissolve_edges()
-        bpy.ops.mesh.select_mode(use_extend=False, use_expand=False, type='VERT')
+        stars, edges = fix_star_mesh(context, obj, star_points.neighbor_star_points_small_batch, False)
+        self.report({'INFO'}, "Fixed %d stars, dissolved %d edges" % (stars, edges))
 
 class SelectFaceEdge(bpy.types.Operator):
     """Tooltip"""
@@ -314,6 +249,7 @@ class SelectFaceEdge(bpy.types.Operator):
     def poll(cls, context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         self.main(context)
         return {'FINISHED'}
@@ -329,9 +265,9 @@ class SelectFaceEdge(bpy.types.Operator):
 
 
 def register():
-    print("Starpoints register")
     bpy.utils.register_class(SelectStarPoints)
     bpy.utils.register_class(SelectStarPointsSmall)
+    bpy.utils.register_class(SelectAllStarPoints)
     bpy.utils.register_class(SelectStarEdges)
     bpy.utils.register_class(SelectStarEdgesSmall)
     bpy.utils.register_class(FixStarMesh)
@@ -341,6 +277,7 @@ def register():
 def unregister():
     bpy.utils.unregister_class(SelectStarPoints)
     bpy.utils.unregister_class(SelectStarPointsSmall)
+    bpy.utils.unregister_class(SelectAllStarPoints)
     bpy.utils.unregister_class(SelectStarEdges)
     bpy.utils.unregister_class(SelectStarEdgesSmall)
     bpy.utils.unregister_class(FixStarMesh)
@@ -0,0 +1,430 @@
+"""
+Shared mesh topology.
+
+Builds compact CSR adjacency arrays (vert->edges, vert->verts, edge->faces,
+face->faces) from the mesh loop layout, once per mesh and topology version.
+Operators ask `get(obj)` for the topology and query integer arrays instead of
+walking BMesh wrappers. Indices match `bm.verts`/`bm.edges`/`bm.faces` after
+`lookup(bm)`.
+"""
+import numpy as np
+
+
+class Adjacency(object):
+    """Compressed sparse rows: the neighbors of i are indices[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def pairs(self):
+        """Return (src, dst) arrays with one entry per stored neighbor."""
+        return np.repeat(np.arange(len(self)), self.degree()), self.indices
+
+
+def csr(src, dst, count):
+    """Group `dst` by `src` into an Adjacency with `count` rows."""
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=count), out=indptr[1:])
+    return Adjacency(indptr, dst[order])
+
+
+def unique_pairs(src, dst, count):
+    """Like csr, but drops duplicate (src, dst) pairs."""
+    keys = np.unique(src * count + dst)
+    return csr(keys // count, keys % count, count)
+
+
+def expand(adj: Adjacency, rows):
+    """Return (i, neighbor) arrays for all neighbors of rows, i indexing into `rows`."""
+    rows = np.asarray(rows, dtype=np.int64)
+    start = adj.indptr[rows]
+    deg = adj.indptr[rows + 1] - start
+    i = np.repeat(np.arange(len(rows)), deg)
+    offset = np.arange(len(i)) - np.repeat(np.cumsum(deg) - deg, deg)
+    return i, adj.indices[start[i] + offset]
+
+
+def contains(sorted_keys, keys):
+    """Vectorized `keys in sorted_keys`."""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[pos] == keys
+
+
+def ring_path_counts(adj: Adjacency, seeds, depth, chunk=4096):
+    """Count the shortest paths from every seed to each node exactly `depth` steps away.
+
+    Frontiers of all seeds are propagated together as sparse (seed, node, count)
+    rows, a chunk of seeds at a time. Returns (owner, node, count) arrays where
+    owner indexes into `seeds`.
+    """
+    seeds = np.asarray(seeds, dtype=np.int64)
+    n = len(adj)
+    owners, nodes, counts = [], [], []
+    for start in range(0, len(seeds), chunk):
+        owner = np.arange(min(chunk, len(seeds) - start), dtype=np.int64)
+        node = seeds[start:start + chunk]
+        count = np.ones(len(node), dtype=np.int64)
+        # Neighbors of ring k lie in rings k - 1, k or k + 1, so only the
+        # last two rings need to be excluded.
+        previous = np.empty(0, dtype=np.int64)
+        current = np.sort(owner * n + node)
+        for _ in range(depth):
+            row, neighbor = expand(adj, node)
+            key = owner[row] * n + neighbor
+            # Sum the path counts of every frontier node reaching the same (seed, node).
+            key, inverse = np.unique(key, return_inverse=True)
+            count = np.bincount(inverse, weights=count[row], minlength=len(key)).astype(np.int64)
+            fresh = ~(contains(current, key) | contains(previous, key))
+            key, count = key[fresh], count[fresh]
+            owner, node = key // n, key % n
+            previous, current = current, key
+        owners.append(owner + start)
+        nodes.append(node)
+        counts.append(count)
+    if not owners:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(owners), np.concatenate(nodes), np.concatenate(counts)
+
+
+def greedy_matching(u, v, weight, count, min_fraction=0.05):
+    """Match the graph with `count` nodes and weighted edges (u, v) greedily by weight.
+
+    Every round picks all edges that are the heaviest alive edge at both of
+    their nodes, which gives the same matching as sequential greedy (at least
+    half the maximum weight). On typical meshes a few vectorized rounds
+    match nearly everything, but a round only has to pick one edge: on a
+    path whose weights rise monotonically, rounds alone would take O(n)
+    rounds of O(n) each. Once a round picks less than `min_fraction` of the
+    alive edges, the rest is matched by one sequential pass instead, which
+    bounds the total at O(n log n) plus the vectorized rounds. Returns the
+    indices of the chosen edges.
+    """
+    rank = np.empty(len(weight), dtype=np.int64)
+    rank[np.argsort(weight, kind='stable')] = np.arange(len(weight))
+    alive = np.flatnonzero(u != v)
+    matched = np.zeros(count, dtype=bool)
+    chosen = []
+    while len(alive):
+        r = rank[alive]
+        best = np.full(count, -1, dtype=np.int64)
+        np.maximum.at(best, u[alive], r)
+        np.maximum.at(best, v[alive], r)
+        pick = alive[(best[u[alive]] == r) & (best[v[alive]] == r)]
+        chosen.append(pick)
+        matched[u[pick]] = True
+        matched[v[pick]] = True
+        stalled = len(pick) < min_fraction * len(alive)
+        alive = alive[~(matched[u[alive]] | matched[v[alive]])]
+        if stalled:
+            break
+
+    if len(alive):
+        # Sequential greedy over what is left, heaviest first.
+        pick = []
+        order = alive[np.argsort(-rank[alive])]
+        for e, a, b in zip(order.tolist(), u[order].tolist(), v[order].tolist()):
+            if not matched[a] and not matched[b]:
+                matched[a] = matched[b] = True
+                pick.append(e)
+        chosen.append(np.array(pick, dtype=np.int64))
+
+    if not chosen:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(chosen)
+
+
+def connected_labels(count, a, b):
+    """Label connected components of the graph with `count` nodes and edges (a, b).
+
+    Every node ends up labelled with the smallest node index of its component.
+    """
+    labels = np.arange(count)
+    while True:
+        la = labels[a]
+        lb = labels[b]
+        lo = np.minimum(la, lb)
+        hi = np.maximum(la, lb)
+        changed = lo != hi
+        if not changed.any():
+            return labels
+        # Hook roots onto the smallest root they touch, then flatten the trees.
+        np.minimum.at(labels, hi[changed], lo[changed])
+        while True:
+            nxt = labels[labels]
+            if np.array_equal(nxt, labels):
+                break
+            labels = nxt
+
+
+class MeshTopology(object):
+    def __init__(self, num_verts, edge_verts, loop_start, loop_total, loop_verts, loop_edges):
+        self.num_verts = num_verts
+        self.num_edges = len(edge_verts)
+        self.num_faces = len(loop_start)
+        self.num_loops = len(loop_verts)
+
+        self.edge_verts = edge_verts  # (num_edges, 2)
+        self.loop_start = loop_start
+        self.loop_total = loop_total
+        self.loop_verts = loop_verts
+        self.loop_edges = loop_edges
+        self.loop_faces = np.repeat(np.arange(self.num_faces), loop_total)
+
+        # Free-form storage for results derived from this topology.
+        self.cache = {}
+
+        self._loop_next = None
+        self._loop_prev = None
+        self._vert_edges = None
+        self._vert_verts = None
+        self._vert_loops = None
+        self._edge_slots = None
+        self._vert_fan = None
+        self._fan_pos = None
+        self._fan_closed = None
+        self._edge_loops = None
+        self._edge_faces = None
+        self._face_faces = None
+
+    @property
+    def loop_next(self):
+        if self._loop_next is None:
+            start = self.loop_start[self.loop_faces]
+            total = self.loop_total[self.loop_faces]
+            self._loop_next = start + (np.arange(self.num_loops) - start + 1) % total
+        return self._loop_next
+
+    @property
+    def loop_prev(self):
+        if self._loop_prev is None:
+            start = self.loop_start[self.loop_faces]
+            total = self.loop_total[self.loop_faces]
+            self._loop_prev = start + (np.arange(self.num_loops) - start - 1) % total
+        return self._loop_prev
+
+    @property
+    def vert_edges(self):
+        if self._vert_edges is None:
+            edges = np.arange(self.num_edges)
+            self._vert_edges = csr(self.edge_verts.ravel(), np.repeat(edges, 2), self.num_verts)
+        return self._vert_edges
+
+    @property
+    def edge_slots(self):
+        """(num_edges, 2) positions of each edge in vert_edges.indices, for its first and second vert."""
+        if self._edge_slots is None:
+            order = np.argsort(self.edge_verts.ravel(), kind='stable')
+            slots = np.empty(2 * self.num_edges, dtype=np.int64)
+            slots[order] = np.arange(2 * self.num_edges)
+            self._edge_slots = slots.reshape(-1, 2)
+        return self._edge_slots
+
+    @property
+    def vert_fan(self):
+        """The edges around each vert in cyclic (radial) order, starting from the vert's first edge.
+
+        Only meaningful where fan_closed is set, see build_fans().
+        """
+        if self._vert_fan is None:
+            self.build_fans()
+        return self._vert_fan
+
+    @property
+    def fan_pos(self):
+        """(num_edges, 2) position of each edge in the vert_fan row of its first and second vert."""
+        if self._fan_pos is None:
+            self.build_fans()
+        return self._fan_pos
+
+    @property
+    def fan_closed(self):
+        """Per vert, True if its faces form a single consistently oriented closed fan."""
+        if self._fan_closed is None:
+            self.build_fans()
+        return self._fan_closed
+
+    def build_fans(self):
+        """Order the edges around every vert from the loops in one vectorized pass.
+
+        Each loop links its incoming edge to its outgoing edge at the loop's
+        vert. Around an interior vert with consistent normals these links form
+        one cycle, which is ranked by pointer jumping from the vert's first
+        edge. Verts on boundaries, non-manifold or flipped geometry get
+        fan_closed False.
+        """
+        vert_edges = self.vert_edges
+        slots = self.edge_slots
+        count = len(vert_edges.indices)
+        row = np.repeat(np.arange(self.num_verts), vert_edges.degree())
+
+        def incidence(edges, verts):
+            return slots[edges, (self.edge_verts[edges, 0] != verts).astype(np.int64)]
+
+        src = incidence(self.loop_edges[self.loop_prev], self.loop_verts)
+        dst = incidence(self.loop_edges, self.loop_verts)
+        pred = np.full(count, -1, dtype=np.int64)
+        pred[dst] = src
+
+        once = (np.bincount(src, minlength=count) == 1) & (np.bincount(dst, minlength=count) == 1)
+        closed = np.ones(self.num_verts, dtype=bool)
+        closed[row[~once]] = False
+
+        # Cut every cycle at the vert's first edge, then rank by pointer jumping.
+        pred[vert_edges.indptr[:-1][vert_edges.degree() > 0]] = -1
+        pred[~closed[row]] = -1
+        rank = (pred >= 0).astype(np.int64)
+        steps = int(np.ceil(np.log2(max(vert_edges.degree().max(initial=1), 2)))) + 1
+        for _ in range(steps):
+            active = pred >= 0
+            if not active.any():
+                break
+            rank = np.where(active, rank + rank[np.maximum(pred, 0)], rank)
+            pred = np.where(active, pred[np.maximum(pred, 0)], -1)
+        # Edges never reaching the first edge belong to a second fan around the vert.
+        closed[row[pred >= 0]] = False
+        rank[~closed[row]] = np.arange(count)[~closed[row]] - vert_edges.indptr[row[~closed[row]]]
+
+        fan = np.empty(count, dtype=np.int64)
+        fan[vert_edges.indptr[row] + rank] = vert_edges.indices
+        self._vert_fan = Adjacency(vert_edges.indptr, fan)
+        self._fan_pos = rank[slots]
+        self._fan_closed = closed
+
+    @property
+    def vert_verts(self):
+        if self._vert_verts is None:
+            a = self.edge_verts[:, 0]
+            b = self.edge_verts[:, 1]
+            self._vert_verts = csr(np.concatenate([a, b]), np.concatenate([b, a]), self.num_verts)
+        return self._vert_verts
+
+    @property
+    def vert_loops(self):
+        if self._vert_loops is None:
+            self._vert_loops = csr(self.loop_verts, np.arange(self.num_loops), self.num_verts)
+        return self._vert_loops
+
+    @property
+    def edge_loops(self):
+        if self._edge_loops is None:
+            self._edge_loops = csr(self.loop_edges, np.arange(self.num_loops), self.num_edges)
+        return self._edge_loops
+
+    @property
+    def edge_faces(self):
+        if self._edge_faces is None:
+            loops = self.edge_loops
+            self._edge_faces = Adjacency(loops.indptr, self.loop_faces[loops.indices])
+        return self._edge_faces
+
+    @property
+    def face_faces(self):
+        if self._face_faces is None:
+            # Pair every loop's face with every face of the loop's edge.
+            loop, dst = expand(self.edge_faces, self.loop_edges)
+            src = self.loop_faces[loop]
+            keep = src != dst
+            self._face_faces = unique_pairs(src[keep], dst[keep], self.num_faces)
+        return self._face_faces
+
+    def face_loops(self, f):
+        start = self.loop_start[f]
+        return np.arange(start, start + self.loop_total[f])
+
+    def same_layout(self, num_verts, edge_verts, loop_start, loop_total, loop_verts, loop_edges):
+        return (num_verts == self.num_verts
+                and np.array_equal(loop_start, self.loop_start)
+                and np.array_equal(loop_verts, self.loop_verts)
+                and np.array_equal(loop_edges, self.loop_edges)
+                and np.array_equal(edge_verts, self.edge_verts))
+
+
+def read_arrays(me):
+    """Pull the topology of `me` into arrays, in MeshTopology argument order."""
+    edge_verts = np.empty(len(me.edges) * 2, dtype=np.int64)
+    loop_start = np.empty(len(me.polygons), dtype=np.int64)
+    loop_total = np.empty(len(me.polygons), dtype=np.int64)
+    loop_verts = np.empty(len(me.loops), dtype=np.int64)
+    loop_edges = np.empty(len(me.loops), dtype=np.int64)
+    me.edges.foreach_get("vertices", edge_verts)
+    me.polygons.foreach_get("loop_start", loop_start)
+    me.polygons.foreach_get("loop_total", loop_total)
+    me.loops.foreach_get("vertex_index", loop_verts)
+    me.loops.foreach_get("edge_index", loop_edges)
+    return len(me.vertices), edge_verts.reshape(-1, 2), loop_start, loop_total, loop_verts, loop_edges
+
+
+def read_selection(seq):
+    """Return the select flags of a mesh element collection as a bool array."""
+    selected = np.empty(len(seq), dtype=bool)
+    seq.foreach_get("select", selected)
+    return selected
+
+
+def read_coords(me):
+    """Return the vertex positions of `me` as a (num_verts, 3) array."""
+    co = np.empty(len(me.vertices) * 3, dtype=np.float64)
+    me.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+# MeshTopology per mesh pointer.
+_cache = {}
+
+
+def get(obj):
+    """Return the topology of `obj`'s mesh, rebuilding it only when the topology changed.
+
+    In edit mode the edit mesh is synced to the mesh data first, so the
+    selection can be read with `read_selection` afterwards. The arrays are
+    compared on every call: Blender bumps nothing we could key the cache on,
+    and edits like edge rotate keep every element count.
+    """
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+    me = obj.data
+    arrays = read_arrays(me)
+
+    topo = _cache.get(me.as_pointer())
+    if topo is not None and topo.same_layout(*arrays):
+        return topo
+
+    topo = MeshTopology(*arrays)
+    _cache[me.as_pointer()] = topo
+    return topo
+
+
+def invalidate(me=None):
+    """Drop the cached topology of `me`, or of every mesh."""
+    if me is None:
+        _cache.clear()
+    else:
+        _cache.pop(me.as_pointer(), None)
+
+
+def retain(meshes):
+    """Drop the cached topologies of every mesh not in `meshes`, e.g. after loading another file."""
+    live = {me.as_pointer() for me in meshes}
+    for pointer in [p for p in _cache if p not in live]:
+        del _cache[pointer]
+
+
+def lookup(bm):
+    """Make bm.verts[i], bm.edges[i], bm.faces[i] and elem.index agree with topology indices."""
+    for seq in (bm.verts, bm.edges, bm.faces):
+        seq.ensure_lookup_table()
+        seq.index_update()
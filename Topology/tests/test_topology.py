@@ -0,0 +1,80 @@
+"""Topology's array helpers against plain Python versions:
+
+    python -m pytest
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import MeshKernel
+import Topology
+from MeshKernel.tests.meshes import grid
+
+
+def greedy_reference(u, v, weight):
+    """Sequential greedy matching, heaviest edge first."""
+    matched = set()
+    chosen = set()
+    for e in sorted(range(len(weight)), key=lambda e: -weight[e]):
+        a, b = int(u[e]), int(v[e])
+        if a != b and a not in matched and b not in matched:
+            matched.update((a, b))
+            chosen.add(e)
+    return chosen
+
+
+class GreedyMatchingTest(unittest.TestCase):
+    def test_random_graphs(self):
+        rng = np.random.RandomState(0)
+        for count, edges in ((10, 20), (200, 600), (1000, 1500)):
+            u = rng.randint(count, size=edges)
+            v = rng.randint(count, size=edges)
+            weight = rng.permutation(edges).astype(np.float64)
+            expected = greedy_reference(u, v, weight)
+            for min_fraction in (0.0, 0.05, 1.0):
+                chosen = Topology.greedy_matching(u, v, weight, count, min_fraction)
+                self.assertEqual(set(chosen.tolist()), expected)
+                self.assertEqual(len(chosen), len(expected))
+
+    def test_monotone_path(self):
+        # Every round picks one edge; the sequential pass finishes it.
+        n = 2000
+        u = np.arange(n - 1)
+        v = u + 1
+        weight = u.astype(np.float64)
+        chosen = Topology.greedy_matching(u, v, weight, n)
+        self.assertEqual(set(chosen.tolist()), greedy_reference(u, v, weight))
+
+    def test_empty(self):
+        empty = np.empty(0, dtype=np.int64)
+        self.assertEqual(len(Topology.greedy_matching(empty, empty, empty.astype(np.float64), 3)), 0)
+
+
+class ConnectedLabelsTest(unittest.TestCase):
+    def test_smallest_node_labels(self):
+        labels = Topology.connected_labels(7, np.array([5, 1, 4]), np.array([3, 2, 6]))
+        self.assertEqual(labels.tolist(), [0, 1, 1, 3, 4, 3, 4])
+
+
+class MeshTopologyTest(unittest.TestCase):
+    def test_adjacency_matches_elements(self):
+        mesh = MeshKernel.from_pydata(*grid(3, 4))
+        topo = mesh.topology()
+        for v in mesh.verts:
+            self.assertEqual(set(topo.vert_verts[v.index].tolist()),
+                             {e.other_vert(v).index for e in v.link_edges})
+        for f in mesh.faces:
+            expected = {n.index for e in f.edges for n in e.link_faces if n != f}
+            self.assertEqual(set(topo.face_faces[f.index].tolist()), expected)
+        for e in mesh.edges:
+            self.assertEqual(set(topo.edge_faces[e.index].tolist()), {f.index for f in e.link_faces})
+
+
+if __name__ == '__main__':
+    unittest.main()
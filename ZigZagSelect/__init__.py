@@ -3,10 +3,16 @@ bl_info = {
     "category": "Object",
     'blender': (2, 80, 0),
 }
-print("B")
 import bpy
 import bmesh
 
+import Instrumentation
+import Loader
+
+np = Loader.lazy("numpy")
+Topology = Loader.lazy("Topology")
+edge_walks = Loader.lazy("MeshKernel.edges")
+
 
 class ZigZagSelect(bpy.types.Operator):
     """Tooltip"""
@@ -18,42 +24,25 @@ class ZigZagSelect(bpy.types.Operator):
     def poll(cls, context: bpy.types.Context):
         return context.mode == 'EDIT_MESH'
 
+    @Instrumentation.operator
     def execute(self, context):
         obj = context.active_object
 
         me = obj.data
+        topo = Topology.get(obj)
         bm = bmesh.from_edit_mesh(me)
+        Topology.lookup(bm)
 
-        zigzag = []  # type: list[bmesh.types.BMEdge]
-        for e in bm.edges:
-            if e.select:
-                zigzag.append(e)
-        assert len(zigzag) == 2, "Expected exactly 2 edges selected"
-        assert len(set(zigzag[0].verts) | set(zigzag[1].verts)) == 3, "Expected edges to be connected."
-        faces = list(set(zigzag[0].link_faces) & set(zigzag[1].link_faces))
-        assert len(faces) == 1, "Expected edges to share a face."
-        def selectZigZag(prevEdge, face, edge):
-            for i in range(1000):
-                if len(edge.link_faces) != 2:
-                    print("Stopping, edge does not have 2 faces.")
-                    break
-                nextFace = [f for f in edge.link_faces if f != face][0]
-                nextEdge = [e for e in nextFace.edges if len(set(prevEdge.verts) & set(e.verts)) == 0][0]
-                if nextEdge.select:
-                    print("Hit selected edge")
-                    nextFace.select = True
-                    break
-                nextFace.select = True
-                nextEdge.select = True
-
-                prevEdge = edge
-                edge = nextEdge
-                face = nextFace
-
-        faces[0].select = True
-        selectZigZag(zigzag[0], faces[0], zigzag[1])
-        selectZigZag(zigzag[1], faces[0], zigzag[0])
+        strips, edges, faces = edge_walks.zigzag_strips(topo, Topology.read_selection(me.edges))
+        if not strips:
+            self.report({'ERROR'}, "Expected pairs of selected edges sharing a triangle.")
+            return {'CANCELLED'}
 
+        for e in edges:
+            bm.edges[e].select = True
+        for f in np.unique(faces):
+            bm.faces[f].select = True
+        self.report({'INFO'}, "Selected %d zigzags" % len(strips))
 
         bmesh.update_edit_mesh(me)
         me.update()
@@ -62,7 +51,6 @@ class ZigZagSelect(bpy.types.Operator):
 
 
 def register():
-    print("ZigZagSelect register")
     bpy.utils.register_class(ZigZagSelect)
 
 